@@ -0,0 +1,72 @@
+"""Представление моделей в JSON с выбором полей через ?fields=."""
+
+
+class InvalidFields(Exception):
+    pass
+
+
+def _image(post):
+    return post.image.url if post.image else None
+
+
+POST_FIELDS = {
+    'id': lambda post: post.pk,
+    'text': lambda post: post.text,
+    'pub_date': lambda post: post.pub_date.isoformat(),
+    'author': lambda post: post.author.username,
+    'group': lambda post: post.group.slug if post.group_id else None,
+    'image': _image,
+    'comments_count': lambda post: post.comments_count,
+}
+# Связанные модели, которые нужны полям: их не присоединяют,
+# если поле не запрошено
+POST_RELATED = {'author': 'author', 'group': 'group'}
+
+COMMENT_FIELDS = {
+    'id': lambda comment: comment.pk,
+    'post': lambda comment: comment.post_id,
+    'author': lambda comment: comment.author.username,
+    'text': lambda comment: comment.text,
+    'created': lambda comment: comment.created.isoformat(),
+}
+COMMENT_RELATED = {'author': 'author'}
+
+
+def parse_fields(value, available):
+    """Список полей из ?fields=; пустое значение — все поля."""
+    if not value:
+        return list(available)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown or not fields:
+        raise InvalidFields(
+            f'Неизвестные поля: {", ".join(unknown)}. '
+            f'Доступны: {", ".join(available)}.'
+        )
+    return fields
+
+
+def related_for(fields, related):
+    return [related[name] for name in fields if name in related]
+
+
+def serialize(obj, fields, available):
+    return {name: available[name](obj) for name in fields}
+
+
+def serialize_group(group):
+    return {
+        'title': group.title,
+        'slug': group.slug,
+        'description': group.description,
+        'posts_count': group.posts_count,
+    }
+
+
+def serialize_author(author):
+    stats = getattr(author, 'stats', None)
+    return {
+        'username': author.username,
+        'full_name': author.get_full_name(),
+        'posts_count': stats.posts_count if stats else 0,
+    }
@@ -0,0 +1,124 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post, User
+
+
+class ApiViewsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Группа', slug='the_group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Текст {i}', author=cls.user, group=cls.group
+            )
+            for i in range(3)
+        ]
+        Comment.objects.create(
+            text='Комментарий', author=cls.user, post=cls.posts[0]
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_return_posts(self):
+        """Ленты отдают посты в JSON вместе с данными группы и автора."""
+        addresses = {
+            reverse('api:index'): None,
+            reverse('api:group_posts', args=['the_group']): 'group',
+            reverse('api:profile', args=['auth']): 'author',
+        }
+        for address, extra in addresses.items():
+            with self.subTest(address=address):
+                data = self.client.get(address).json()
+                self.assertEqual(
+                    [post['id'] for post in data['results']],
+                    [post.pk for post in reversed(self.posts)]
+                )
+                self.assertEqual(data['results'][0]['author'], 'auth')
+                if extra:
+                    self.assertIn(extra, data)
+
+    def test_cursor_pagination(self):
+        """Ссылка next ведёт на следующую страницу по курсору."""
+        first = self.client.get(reverse('api:index'), {'limit': 2}).json()
+        self.assertEqual(len(first['results']), 2)
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).json()
+        self.assertEqual(second['results'][0]['id'], self.posts[0].pk)
+        self.assertIsNone(second['next'])
+
+    def test_sparse_fields(self):
+        """?fields= оставляет только нужные поля и не трогает связи."""
+        address = reverse('api:post_detail', args=[self.posts[0].pk])
+        with self.assertNumQueries(1):
+            data = self.client.get(address, {'fields': 'id,text'}).json()
+        self.assertEqual(data, {'id': self.posts[0].pk, 'text': 'Текст 0'})
+        response = self.client.get(address, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_comments(self):
+        """Комментарии поста отдаются постранично."""
+        data = self.client.get(
+            reverse('api:post_comments', args=[self.posts[0].pk])
+        ).json()
+        self.assertEqual(data['results'][0]['text'], 'Комментарий')
+
+    def test_missing_objects(self):
+        """Несуществующие объекты дают 404 в JSON."""
+        addresses = [
+            reverse('api:post_detail', args=[999]),
+            reverse('api:group_posts', args=['nope']),
+            reverse('api:profile', args=['nobody']),
+        ]
+        for address in addresses:
+            with self.subTest(address=address):
+                response = self.client.get(address)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('detail', response.json())
+
+    def test_conditional_get(self):
+        """Пока данные не менялись, повторный запрос получает 304."""
+        address = reverse('api:group_posts', args=['the_group'])
+        response = self.client.get(address)
+        self.assertIn('no-cache', response['Cache-Control'])
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('Last-Modified', response)
+        Post.objects.create(text='Новый', author=self.user, group=self.group)
+        response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_new_comment_changes_feed_etag(self):
+        """Новый комментарий меняет ETag лент, где есть comments_count."""
+        addresses = [
+            reverse('api:index'),
+            reverse('api:group_posts', args=['the_group']),
+            reverse('api:profile', args=['auth']),
+        ]
+        etags = {
+            address: self.client.get(address)['ETag']
+            for address in addresses
+        }
+        Comment.objects.create(
+            text='Ещё один', author=self.user, post=self.posts[1]
+        )
+        for address, etag in etags.items():
+            with self.subTest(address=address):
+                response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_query(self):
+        """Разные параметры запроса — разные ETag."""
+        address = reverse('api:index')
+        self.assertNotEqual(
+            self.client.get(address)['ETag'],
+            self.client.get(address, {'fields': 'id'})['ETag']
+        )
@@ -0,0 +1,148 @@
+from functools import wraps
+
+from django.http import JsonResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_GET
+
+from posts.cache import conditional as scope_condition
+from posts.models import Group, Post, User
+from posts.pagination import CursorPaginator
+from posts.views import COMMENTS_PER_PAGE, QT_POST_PG
+
+from .serializers import (
+    COMMENT_FIELDS, COMMENT_RELATED, POST_FIELDS, POST_RELATED,
+    InvalidFields, parse_fields, related_for, serialize, serialize_author,
+    serialize_group
+)
+
+MAX_LIMIT = 100
+
+
+class BadRequest(Exception):
+    pass
+
+
+def error(status, detail):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def conditional(scope):
+    """GET с ETag и Last-Modified по версии области кэша.
+
+    Пока версия прежняя, клиент получает 304 без единого запроса
+    к базе. Ошибки в параметрах превращаются в 400.
+    """
+    def decorator(view):
+        @scope_condition(scope)
+        def checked(request, *args, **kwargs):
+            try:
+                return view(request, *args, **kwargs)
+            except (BadRequest, InvalidFields) as problem:
+                return error(400, str(problem))
+
+        @require_GET
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = checked(request, *args, **kwargs)
+            # Ответ можно хранить, но перед показом надо спросить сервер,
+            # в том числе и 304
+            patch_cache_control(response, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def get_limit(request, default):
+    value = request.GET.get('limit')
+    if value is None:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise BadRequest('limit должен быть числом.')
+    if not 1 <= limit <= MAX_LIMIT:
+        raise BadRequest(f'limit должен быть от 1 до {MAX_LIMIT}.')
+    return limit
+
+
+def page_url(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+
+
+def paginated(request, queryset, fields, available, ordering, per_page):
+    page = CursorPaginator(
+        queryset, get_limit(request, per_page), ordering=ordering
+    ).get_page(request.GET.get('cursor'))
+    return {
+        'results': [serialize(obj, fields, available) for obj in page],
+        'next': page_url(request, page.next_cursor),
+        'previous': page_url(request, page.previous_cursor),
+    }
+
+
+def post_feed(request, queryset, **extra):
+    fields = parse_fields(request.GET.get('fields'), POST_FIELDS)
+    queryset = queryset.select_related(*related_for(fields, POST_RELATED))
+    data = paginated(
+        request, queryset, fields, POST_FIELDS,
+        ('-pub_date', '-id'), QT_POST_PG
+    )
+    return JsonResponse(dict(extra, **data))
+
+
+@conditional('index')
+def index(request):
+    return post_feed(request, Post.objects.all())
+
+
+@conditional('group:{slug}')
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return error(404, 'Группа не найдена.')
+    return post_feed(
+        request, group.posts.all(), group=serialize_group(group)
+    )
+
+
+@conditional('profile:{username}')
+def profile(request, username):
+    author = User.objects.select_related('stats').filter(
+        username=username
+    ).first()
+    if author is None:
+        return error(404, 'Пользователь не найден.')
+    return post_feed(
+        request, author.posts.all(), author=serialize_author(author)
+    )
+
+
+@conditional('post:{post_id}')
+def post_detail(request, post_id):
+    fields = parse_fields(request.GET.get('fields'), POST_FIELDS)
+    post = Post.objects.select_related(
+        *related_for(fields, POST_RELATED)
+    ).filter(pk=post_id).first()
+    if post is None:
+        return error(404, 'Пост не найден.')
+    return JsonResponse(serialize(post, fields, POST_FIELDS))
+
+
+@conditional('post:{post_id}')
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return error(404, 'Пост не найден.')
+    fields = parse_fields(request.GET.get('fields'), COMMENT_FIELDS)
+    comments = Post(pk=post_id).comments.select_related(
+        *related_for(fields, COMMENT_RELATED)
+    )
+    return JsonResponse(paginated(
+        request, comments, fields, COMMENT_FIELDS,
+        ('created', 'id'), COMMENTS_PER_PAGE
+    ))
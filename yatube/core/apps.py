@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from .cache import check_cache_client
+        from .db import apply_pragmas, check_connections
+        check_cache_client()
+        connection_created.connect(apply_pragmas)
+        request_started.connect(check_connections)
@@ -0,0 +1,60 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from .routers import use_primary
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BACKGROUND_WORKERS,
+                thread_name_prefix='yatube-background',
+            )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        # Задачу ставят сразу после записи, реплика её ещё не видела
+        with use_primary():
+            func(*args, **kwargs)
+    except Exception:
+        logger.exception('Фоновая задача %s завершилась ошибкой', func)
+    finally:
+        # У потока пула свои соединения с БД, держать их открытыми незачем
+        connections.close_all()
+
+
+def submit(func, *args, **kwargs):
+    """Выполняет функцию в фоновом пуле потоков.
+
+    При BACKGROUND_WORKERS = 0 функция выполняется сразу, в том же потоке.
+    """
+    if not settings.BACKGROUND_WORKERS:
+        with use_primary():
+            func(*args, **kwargs)
+        return
+    _get_executor().submit(_run, func, args, kwargs)
+
+
+def submit_on_commit(func, *args, **kwargs):
+    """Ставит задачу в пул после фиксации текущей транзакции."""
+    transaction.on_commit(lambda: submit(func, *args, **kwargs))
+
+
+def submit_later(delay, func, *args, **kwargs):
+    """Ставит задачу в пул через delay секунд."""
+    timer = threading.Timer(delay, submit, (func, *args), kwargs)
+    timer.daemon = True
+    timer.start()
@@ -0,0 +1,269 @@
+"""Нагрузочный прогон страниц Yatube и сравнение с сохранённым эталоном.
+
+Данные заполняются через mixer во временной тестовой базе, каждый адрес
+из posts/urls.py, users/urls.py и about/urls.py запрашивается тестовым
+клиентом. Для адреса считаются p50/p95 задержки, число SQL-запросов и
+пик памяти, выделенной за запрос.
+"""
+import io
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+from PIL import Image
+
+NAMESPACES = ('posts', 'users', 'about')
+# Ниже этих порогов разница — шум измерения, а не регрессия
+LATENCY_NOISE_MS = 5
+MEMORY_NOISE_KB = 64
+
+
+class Scenario:
+    """Запрос к одному адресу: метод, параметры и клиент."""
+
+    def __init__(self, name, url, method='get', data=None, client='anon'):
+        self.name = name
+        self.url = url
+        self.method = method
+        self.data = data or {}
+        self.client = client
+
+    def __repr__(self):
+        return f'<Scenario {self.name}>'
+
+
+def make_image(width=800, height=600):
+    buffer = io.BytesIO()
+    Image.new(
+        'RGB', (width, height),
+        tuple(random.randrange(256) for _ in range(3))
+    ).save(buffer, 'JPEG')
+    return SimpleUploadedFile(
+        'bench.jpg', buffer.getvalue(), content_type='image/jpeg'
+    )
+
+
+def seed(users=50, groups=10, posts=1000, images=50, comments=2000,
+         follows=200):
+    """Заполняет базу через mixer и возвращает данные для сценариев."""
+    from faker import Faker
+    from mixer.backend.django import Mixer
+
+    from posts.models import Comment, Follow, Group, Post, User
+
+    # Одни и те же данные при каждом прогоне, иначе сравнивать не с чем
+    random.seed(0)
+    Faker.seed(0)
+    mixer = Mixer(locale='ru')
+    authors = mixer.cycle(users).blend(
+        User, username=mixer.sequence('user{0}')
+    )
+    all_groups = mixer.cycle(groups).blend(
+        Group, slug=mixer.sequence('group-{0}'), posts_count=0
+    )
+    all_posts = mixer.cycle(posts).blend(
+        Post,
+        author=(random.choice(authors) for _ in range(posts)),
+        group=(random.choice(all_groups + [None]) for _ in range(posts)),
+        image='',
+        comments_count=0,
+    )
+    for post in random.sample(all_posts, min(images, posts)):
+        post.image = make_image()
+        post.save()
+    mixer.cycle(comments).blend(
+        Comment,
+        post=(random.choice(all_posts[:20]) for _ in range(comments)),
+        author=(random.choice(authors) for _ in range(comments)),
+    )
+    pairs = {
+        tuple(random.sample(authors, 2)) for _ in range(follows)
+    }
+    for user, author in pairs:
+        Follow.objects.create(user=user, author=author)
+    reader = authors[0]
+    post = Post.objects.filter(author=reader).first() or all_posts[0]
+    return {
+        'reader': reader,
+        'author': authors[1],
+        'post': post,
+        'busy_post': Comment.objects.values_list(
+            'post', flat=True
+        ).first(),
+        'group': all_groups[0],
+        'word': post.text.split()[0],
+    }
+
+
+def scenarios(data):
+    """Сценарии для всех адресов; ключ — имя адреса с пространством имён."""
+    post = data['post']
+    post_id = post.pk
+    author = data['author'].username
+    items = [
+        Scenario('posts:index', reverse('posts:index')),
+        Scenario('posts:group_list', reverse(
+            'posts:group_list', args=[data['group'].slug]
+        )),
+        Scenario('posts:profile', reverse('posts:profile', args=[author])),
+        Scenario('posts:profile_follow', reverse(
+            'posts:profile_follow', args=[author]
+        ), 'post', client='reader'),
+        Scenario('posts:profile_unfollow', reverse(
+            'posts:profile_unfollow', args=[author]
+        ), 'post', client='reader'),
+        Scenario('posts:follow_index', reverse('posts:follow_index'),
+                 client='reader'),
+        Scenario('posts:post_detail', reverse(
+            'posts:post_detail', args=[data['busy_post']]
+        )),
+        Scenario('posts:search', reverse('posts:search'),
+                 data={'q': data['word']}),
+        Scenario('posts:post_create', reverse('posts:post_create'), 'post',
+                 data={'text': 'Пост из нагрузочного прогона'},
+                 client='reader'),
+        Scenario('posts:post_edit', reverse(
+            'posts:post_edit', args=[post_id]
+        ), client='reader'),
+        Scenario('posts:post_comments', reverse(
+            'posts:post_comments', args=[data['busy_post']]
+        )),
+        Scenario('posts:add_comment', reverse(
+            'posts:add_comment', args=[post_id]
+        ), 'post', data={'text': 'Комментарий'}, client='reader'),
+        Scenario('users:signup', reverse('users:signup')),
+        Scenario('users:login', reverse('users:login')),
+        Scenario('users:logout', reverse('users:logout'),
+                 client='throwaway'),
+        Scenario('about:author', reverse('about:author')),
+        Scenario('about:tech', reverse('about:tech')),
+    ]
+    return {scenario.name: scenario for scenario in items}
+
+
+def url_names():
+    """Имена всех адресов из NAMESPACES."""
+    resolver = get_resolver()
+    names = set()
+    for namespace in NAMESPACES:
+        _, sub_resolver = resolver.namespace_dict[namespace]
+        names.update(
+            f'{namespace}:{pattern.name}'
+            for pattern in sub_resolver.url_patterns
+            if pattern.name
+        )
+    return names
+
+
+def uncovered(available):
+    """Адреса, для которых не написан сценарий."""
+    return sorted(url_names() - set(available))
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[max(int(len(values) * fraction) - 1, 0)]
+
+
+class Runner:
+    def __init__(self, data, repeat=20, warmup=2, cold=True):
+        self.repeat = repeat
+        self.warmup = warmup
+        self.cold = cold
+        self.clients = {
+            'anon': Client(),
+            'reader': Client(),
+        }
+        self.clients['reader'].force_login(data['reader'])
+        self.reader = data['reader']
+
+    def client_for(self, scenario):
+        if scenario.client == 'throwaway':
+            # Выход разлогинивает клиента, поэтому каждый раз новый
+            client = Client()
+            client.force_login(self.reader)
+            return client
+        return self.clients[scenario.client]
+
+    def request(self, scenario, client):
+        return getattr(client, scenario.method)(scenario.url, scenario.data)
+
+    def prepare(self, scenario):
+        """Клиент для запроса; кэш очищается до замера, а не во время."""
+        if self.cold:
+            cache.clear()
+        return self.client_for(scenario)
+
+    def measure(self, scenario):
+        for _ in range(self.warmup):
+            self.request(scenario, self.prepare(scenario))
+        timings = []
+        queries = []
+        for _ in range(self.repeat):
+            client = self.prepare(scenario)
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = self.request(scenario, client)
+                timings.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                raise RuntimeError(
+                    f'{scenario.name}: ответ {response.status_code}'
+                )
+            queries.append(len(captured))
+        # tracemalloc замедляет выполнение, поэтому память
+        # считается отдельным запросом
+        client = self.prepare(scenario)
+        tracemalloc.start()
+        self.request(scenario, client)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {
+            'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'queries': max(queries),
+            'memory_kb': round(peak / 1024),
+        }
+
+
+def compare(results, baseline, tolerance):
+    """Регрессии относительно эталона: список строк с описанием.
+
+    Число запросов сравнивается точно, медианная задержка и память —
+    с допуском `tolerance` (доля от эталона).
+    """
+    problems = []
+    for name, current in sorted(results.items()):
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        if current['queries'] > reference['queries']:
+            problems.append(
+                f'{name}: запросов {current["queries"]}, '
+                f'в эталоне {reference["queries"]}'
+            )
+        # p95 из пары десятков замеров — почти максимум, он скачет
+        # от прогона к прогону; медиана устойчивее
+        limit = reference['p50_ms'] * (1 + tolerance)
+        if (current['p50_ms'] > limit
+                and current['p50_ms'] - reference['p50_ms']
+                > LATENCY_NOISE_MS):
+            problems.append(
+                f'{name}: p50 {current["p50_ms"]} мс, '
+                f'в эталоне {reference["p50_ms"]} мс'
+            )
+        limit = reference['memory_kb'] * (1 + tolerance)
+        if (current['memory_kb'] > limit
+                and current['memory_kb'] - reference['memory_kb']
+                > MEMORY_NOISE_KB):
+            problems.append(
+                f'{name}: память {current["memory_kb"]} КБ, '
+                f'в эталоне {reference["memory_kb"]} КБ'
+            )
+    return problems
@@ -0,0 +1,27 @@
+"""Проверка пресетов кэша из settings.CACHE_PRESETS."""
+from importlib.util import find_spec
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+def missing_client(preset):
+    """Пакет-клиент, без которого пресет не работает, или None."""
+    module, package = preset.get('REQUIRES', (None, None))
+    if module is None or find_spec(module) is not None:
+        return None
+    return package
+
+
+def check_cache_client():
+    """Останавливает запуск, если для YATUBE_CACHE не установлен клиент.
+
+    Иначе сайт стартует, а падает только первый запрос, который
+    обратится к кэшу.
+    """
+    package = missing_client(settings.CACHE_PRESETS[settings.YATUBE_CACHE])
+    if package:
+        raise ImproperlyConfigured(
+            f'YATUBE_CACHE={settings.YATUBE_CACHE} требует пакет '
+            f'{package}: pip install {package}'
+        )
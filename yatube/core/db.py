@@ -0,0 +1,32 @@
+"""Настройка соединений с базой по ключам из settings.DATABASES.
+
+PRAGMAS — параметры SQLite, которые задаются каждому новому
+соединению. CONN_HEALTH_CHECKS — проверять сохранённое между запросами
+соединение перед новым запросом и открывать заново, если оно умерло.
+"""
+from django.db import connections
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = connection.settings_dict.get('PRAGMAS') or {}
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def check_connections(**kwargs):
+    """Закрывает сохранённые соединения, которые больше не отвечают.
+
+    Django проверяет соединение, только если в нём уже была ошибка,
+    поэтому соединение, оборванное сервером базы между запросами,
+    уронило бы первый запрос пользователя.
+    """
+    for connection in connections.all():
+        if connection.connection is None:
+            continue
+        if not connection.settings_dict.get('CONN_HEALTH_CHECKS'):
+            continue
+        if not connection.is_usable():
+            connection.close()
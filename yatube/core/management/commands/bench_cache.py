@@ -0,0 +1,117 @@
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.utils.module_loading import import_string
+
+from core.cache import missing_client
+
+# Замер не должен трогать рабочий кэш: своя таблица для db и свой
+# префикс ключей для общих серверов
+BENCH_TABLE = 'yatube_cache_bench'
+BENCH_PREFIX = 'yatube-bench'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает бэкенды кэша: задержку попадания и память, '
+        'которую кэш занимает в одном воркере.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'backends',
+            nargs='*',
+            default=['locmem', 'file', 'db'],
+            help='Имена из settings.CACHE_PRESETS.',
+        )
+        parser.add_argument('--entries', type=int, default=500)
+        parser.add_argument(
+            '--size', type=int, default=20 * 1024,
+            help='Размер одной записи в байтах (примерно страница ленты).',
+        )
+
+    def handle(self, *args, **options):
+        payload = 'x' * options['size']
+        self.stdout.write(
+            f'{"бэкенд":<10} {"p50, мкс":>10} {"p95, мкс":>10} '
+            f'{"память, КБ":>12}'
+        )
+        for name in options['backends']:
+            try:
+                cache = self.make_cache(name)
+                result = self.measure(cache, payload, options['entries'])
+            except Exception as error:
+                self.stdout.write(f'{name:<10} пропущен: {error}')
+                continue
+            self.stdout.write(
+                f'{name:<10} {result["p50"]:>10.1f} {result["p95"]:>10.1f} '
+                f'{result["memory"] / 1024:>12.0f}'
+            )
+
+    def make_cache(self, name):
+        """Отдельный экземпляр кэша, который не задевает рабочие данные.
+
+        file и db пишут во временный каталог и временную таблицу, а
+        общие серверы memcached и redis — под своим префиксом ключей.
+        """
+        preset = dict(settings.CACHE_PRESETS[name])
+        package = missing_client(preset)
+        if package:
+            raise CommandError(f'нужен пакет {package}')
+        location = preset['LOCATION']
+        if name == 'file':
+            location = tempfile.mkdtemp(prefix='yatube-cache-')
+        if name == 'db':
+            location = BENCH_TABLE
+            call_command('createcachetable', location, verbosity=0)
+        params = {
+            'TIMEOUT': None,
+            'KEY_PREFIX': BENCH_PREFIX,
+            'OPTIONS': {'MAX_ENTRIES': 10 ** 6},
+        }
+        return import_string(preset['BACKEND'])(location, params)
+
+    def measure(self, cache, payload, entries):
+        keys = [f'bench:{i}' for i in range(entries)]
+        tracemalloc.start()
+        try:
+            for key in keys:
+                cache.set(key, payload)
+            # Память, которая осталась занятой в этом процессе после
+            # записи; журнал SQL-запросов при DEBUG к кэшу не относится
+            reset_queries()
+            memory, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            timings = []
+            for key in keys:
+                started = time.perf_counter()
+                cache.get(key)
+                timings.append((time.perf_counter() - started) * 10 ** 6)
+        finally:
+            tracemalloc.stop()
+            self.cleanup(cache, keys)
+        timings.sort()
+        return {
+            'p50': statistics.median(timings),
+            'p95': timings[int(len(timings) * 0.95) - 1],
+            'memory': memory,
+        }
+
+    def cleanup(self, cache, keys):
+        """Удаляет только то, что записал замер."""
+        if hasattr(cache, '_dir'):
+            shutil.rmtree(cache._dir, ignore_errors=True)
+        elif getattr(cache, '_table', None) == BENCH_TABLE:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'DROP TABLE {connection.ops.quote_name(BENCH_TABLE)}'
+                )
+        else:
+            cache.delete_many(keys)
@@ -0,0 +1,168 @@
+import os
+import random
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+from posts.models import Comment, Group, Post, User
+
+ALIAS = 'bench_db'
+PER_PAGE = 10
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает отдельную базу SQLite параллельными чтениями ленты '
+        'и записью комментариев и сравнивает профили соединений '
+        'из settings.DATABASE_PROFILES.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'profiles',
+            nargs='*',
+            default=['dev', 'production'],
+            help='Имена из settings.DATABASE_PROFILES.',
+        )
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument(
+            '--duration', type=float, default=5,
+            help='Длительность нагрузки на профиль в секундах.',
+        )
+        parser.add_argument('--posts', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"профиль":<12} {"чтений/с":>9} {"записей/с":>10} '
+            f'{"p50 чт., мс":>12} {"p95 чт., мс":>12} '
+            f'{"p95 зап., мс":>13} {"ошибок":>7}'
+        )
+        for name in options['profiles']:
+            handle, path = tempfile.mkstemp(suffix='.sqlite3')
+            os.close(handle)
+            self.register(path, settings.DATABASE_PROFILES[name])
+            try:
+                self.create_schema(options['posts'])
+                result = self.load(options)
+            finally:
+                connections[ALIAS].close()
+                del connections[ALIAS]
+                del connections.databases[ALIAS]
+                for suffix in ('', '-wal', '-shm'):
+                    if os.path.exists(path + suffix):
+                        os.remove(path + suffix)
+            self.stdout.write(
+                f'{name:<12} {result["reads"]:>9.0f} '
+                f'{result["writes"]:>10.0f} '
+                f'{result["read_p50"]:>12.2f} {result["read_p95"]:>12.2f} '
+                f'{result["write_p95"]:>13.2f} {result["errors"]:>7}'
+            )
+
+    def register(self, path, profile):
+        default = settings.DATABASES['default']
+        connections.databases[ALIAS] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': path,
+            'OPTIONS': default.get('OPTIONS', {}),
+            **profile,
+        }
+        connections.ensure_defaults(ALIAS)
+        connections.prepare_test_settings(ALIAS)
+
+    def create_schema(self, posts):
+        connection = connections[ALIAS]
+        with connection.schema_editor() as editor:
+            for model in (User, Group, Post, Comment):
+                editor.create_model(model)
+        author = User.objects.db_manager(ALIAS).create(username='author')
+        Post.objects.using(ALIAS).bulk_create(
+            Post(text=f'Пост {number}', author=author)
+            for number in range(posts)
+        )
+        connection.close()
+
+    def load(self, options):
+        deadline = time.perf_counter() + options['duration']
+        post_ids = list(
+            Post.objects.using(ALIAS).values_list('pk', flat=True)
+        )
+        author_id = User.objects.using(ALIAS).get().pk
+        connections[ALIAS].close()
+        results = {'read': [], 'write': [], 'errors': 0}
+        lock = threading.Lock()
+
+        def read():
+            list(Post.objects.using(ALIAS).select_related(
+                'author', 'group'
+            )[:PER_PAGE])
+
+        def write():
+            # Как add_comment: комментарий и счётчик в одной транзакции
+            post_id = random.choice(post_ids)
+            with transaction.atomic(using=ALIAS):
+                with connections[ALIAS].cursor() as cursor:
+                    cursor.execute(
+                        'INSERT INTO posts_comment '
+                        '(post_id, author_id, text, created) '
+                        "VALUES (%s, %s, 'Комментарий', "
+                        "datetime('now'))",
+                        [post_id, author_id]
+                    )
+                    cursor.execute(
+                        'UPDATE posts_post SET comments_count = '
+                        'comments_count + 1 WHERE id = %s',
+                        [post_id]
+                    )
+
+        def worker(operation, kind):
+            timings = []
+            errors = 0
+            connection = connections[ALIAS]
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    operation()
+                except OperationalError:
+                    errors += 1
+                else:
+                    timings.append((time.perf_counter() - started) * 1000)
+                # Конец «запроса»: при CONN_MAX_AGE = 0 соединение
+                # закрывается, как после ответа
+                if not connection.settings_dict['CONN_MAX_AGE']:
+                    connection.close()
+            connection.close()
+            with lock:
+                results[kind].extend(timings)
+                results['errors'] += errors
+
+        threads = [
+            threading.Thread(target=worker, args=(read, 'read'))
+            for _ in range(options['readers'])
+        ] + [
+            threading.Thread(target=worker, args=(write, 'write'))
+            for _ in range(options['writers'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return {
+            'reads': len(results['read']) / options['duration'],
+            'writes': len(results['write']) / options['duration'],
+            'read_p50': percentile(results['read'], 0.5),
+            'read_p95': percentile(results['read'], 0.95),
+            'write_p95': percentile(results['write'], 0.95),
+            'errors': results['errors'],
+        }
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[max(int(len(values) * fraction) - 1, 0)]
@@ -0,0 +1,134 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from core.benchmark import Runner, compare, scenarios, seed, uncovered
+
+DEFAULT_BASELINE = os.path.join(
+    settings.BASE_DIR, 'benchmarks', 'baseline.json'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет временную тестовую базу, запрашивает все страницы '
+        'и сравнивает задержку, число запросов и память с эталоном. '
+        'При регрессии завершается с ошибкой.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names', nargs='*',
+            help='Адреса вида posts:index; по умолчанию все.',
+        )
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--images', type=int, default=50)
+        parser.add_argument('--comments', type=int, default=2000)
+        parser.add_argument('--follows', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--warm', action='store_true',
+            help='Не очищать кэш перед запросом: замер с прогретым кэшем.',
+        )
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Записать результаты как новый эталон.',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=1.0,
+            help='Допустимый рост задержки и памяти, доля от эталона.',
+        )
+
+    def handle(self, *args, **options):
+        mode = 'warm' if options['warm'] else 'cold'
+        media_root = tempfile.mkdtemp(prefix='yatube-bench-')
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            # Фоновые задачи выполняются сразу, чтобы не мешать замерам
+            with override_settings(
+                MEDIA_ROOT=media_root, BACKGROUND_WORKERS=0
+            ):
+                results = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(media_root, ignore_errors=True)
+        self.report(results)
+        if options['save_baseline']:
+            self.save_baseline(options['baseline'], mode, results)
+            return
+        self.check_baseline(options, mode, results)
+
+    def run(self, options):
+        data = seed(
+            users=options['users'], groups=options['groups'],
+            posts=options['posts'], images=options['images'],
+            comments=options['comments'], follows=options['follows'],
+        )
+        available = scenarios(data)
+        missing = uncovered(available)
+        if missing:
+            raise CommandError(
+                f'Нет сценариев для адресов: {", ".join(missing)}'
+            )
+        names = options['names'] or sorted(available)
+        unknown = set(names) - set(available)
+        if unknown:
+            raise CommandError(f'Неизвестные адреса: {", ".join(unknown)}')
+        runner = Runner(
+            data, repeat=options['repeat'], cold=not options['warm']
+        )
+        return {name: runner.measure(available[name]) for name in names}
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"адрес":<26} {"p50, мс":>8} {"p95, мс":>8} '
+            f'{"запросов":>9} {"память, КБ":>11}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<26} {result["p50_ms"]:>8.2f} '
+                f'{result["p95_ms"]:>8.2f} {result["queries"]:>9} '
+                f'{result["memory_kb"]:>11}'
+            )
+
+    def save_baseline(self, path, mode, results):
+        baseline = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as file:
+                baseline = json.load(file)
+        baseline.setdefault(mode, {}).update(results)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(baseline, file, ensure_ascii=False, indent=2,
+                      sort_keys=True)
+            file.write('\n')
+        self.stdout.write(self.style.SUCCESS(f'Эталон записан в {path}'))
+
+    def check_baseline(self, options, mode, results):
+        path = options['baseline']
+        if not os.path.exists(path):
+            self.stdout.write(
+                f'Эталона {path} нет, сравнение пропущено. '
+                f'Запишите его через --save-baseline.'
+            )
+            return
+        with open(path, encoding='utf-8') as file:
+            baseline = json.load(file).get(mode, {})
+        problems = compare(results, baseline, options['tolerance'])
+        if problems:
+            raise CommandError(
+                'Регрессии относительно эталона:\n' + '\n'.join(problems)
+            )
+        self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.replication import copy_database
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite во все реплики из '
+        'settings.DATABASE_REPLICAS: один раз или каждые --interval секунд.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            help='Повторять копирование с этим интервалом, пока не прервут.',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError(
+                'Реплики не настроены: задайте YATUBE_DB_REPLICAS.'
+            )
+        aliases = ['default', *settings.DATABASE_REPLICAS]
+        if any(connections[alias].vendor != 'sqlite' for alias in aliases):
+            raise CommandError('Копирование поддерживается только для SQLite.')
+        source = connections['default'].settings_dict['NAME']
+        while True:
+            started = time.perf_counter()
+            for alias in settings.DATABASE_REPLICAS:
+                copy_database(source, connections[alias].settings_dict['NAME'])
+            self.stdout.write(
+                f'Скопировано в {len(settings.DATABASE_REPLICAS)} '
+                f'реплик за {(time.perf_counter() - started) * 1000:.0f} мс'
+            )
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,37 @@
+from django.conf import settings
+
+from .routers import pop_wrote, use_primary
+
+PIN_COOKIE = 'yatube_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class PrimaryPinMiddleware:
+    """Читать свои записи: после записи пользователь читает из default.
+
+    Изменяющие запросы читают из default целиком. Если запрос что-то
+    записал, в ответ ставится кука на DATABASE_REPLICA_LAG секунд,
+    и пока она жива, чтения этого пользователя тоже идут в default.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        pinned = (
+            request.method not in SAFE_METHODS
+            or PIN_COOKIE in request.COOKIES
+        )
+        pop_wrote()
+        with use_primary(pinned):
+            response = self.get_response(request)
+        if pop_wrote():
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.DATABASE_REPLICA_LAG,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
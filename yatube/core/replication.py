@@ -0,0 +1,19 @@
+"""Копирование основной базы SQLite в реплики.
+
+Заменитель настоящей репликации для локальной проверки маршрутизации:
+онлайн-бэкап SQLite переносит в реплику согласованный снимок, пока в
+основную базу продолжают писать, а открытые соединения реплики видят
+новые данные со следующего запроса.
+"""
+import sqlite3
+
+
+def copy_database(source, target, timeout=20):
+    """Переписывает файл target снимком базы source."""
+    origin = sqlite3.connect(source, timeout=timeout)
+    replica = sqlite3.connect(target, timeout=timeout)
+    try:
+        origin.backup(replica)
+    finally:
+        replica.close()
+        origin.close()
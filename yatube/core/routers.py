@@ -0,0 +1,64 @@
+"""Чтение из реплик, запись в default.
+
+Реплика отстаёт от основной базы, поэтому после записи поток читает
+из default до конца запроса, а PrimaryPinMiddleware продлевает это
+на следующие запросы пользователя.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+PRIMARY = 'default'
+# Запись в таблицу кэша — не запись данных пользователя
+UNPINNED_APPS = {'django_cache'}
+
+_state = threading.local()
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def pop_wrote():
+    """Была ли запись с прошлого вызова; флаг сбрасывается."""
+    wrote = getattr(_state, 'wrote', False)
+    _state.wrote = False
+    return wrote
+
+
+@contextmanager
+def use_primary(pinned=True):
+    """Внутри блока все чтения потока идут в default."""
+    previous = is_pinned()
+    _state.pinned = pinned
+    try:
+        yield
+    finally:
+        _state.pinned = previous
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not settings.DATABASE_REPLICAS or is_pinned():
+            return PRIMARY
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in UNPINNED_APPS:
+            _state.pinned = True
+            _state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема приезжает в реплики вместе с данными
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,24 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from ..management.commands.bench_cache import BENCH_TABLE
+
+
+class BenchCacheCommandTest(TestCase):
+    def test_live_cache_untouched(self):
+        """Замер не очищает рабочий кэш и убирает свою таблицу."""
+        cache.set('live', 'страница')
+        out = StringIO()
+        call_command(
+            'bench_cache', 'locmem', 'db', '--entries', '20', '--size', '10',
+            stdout=out
+        )
+        self.assertNotIn('пропущен', out.getvalue())
+        self.assertEqual(cache.get('live'), 'страница')
+        self.assertNotIn(
+            BENCH_TABLE, connection.introspection.table_names()
+        )
@@ -0,0 +1,38 @@
+from django.test import SimpleTestCase, TestCase
+
+from ..benchmark import compare, scenarios, seed, uncovered
+
+REFERENCE = {'p50_ms': 10, 'p95_ms': 20, 'queries': 3, 'memory_kb': 200}
+
+
+class BenchmarkScenariosTest(TestCase):
+    def test_every_url_has_scenario(self):
+        """Для каждого адреса posts, users и about есть сценарий."""
+        data = seed(
+            users=3, groups=1, posts=5, images=0, comments=3, follows=2
+        )
+        self.assertEqual(uncovered(scenarios(data)), [])
+
+
+class BenchmarkCompareTest(SimpleTestCase):
+    def test_same_results_pass(self):
+        """Результат в пределах допуска регрессией не считается."""
+        current = dict(REFERENCE, p50_ms=14, p95_ms=40, memory_kb=250)
+        self.assertEqual(
+            compare({'posts:index': current}, {'posts:index': REFERENCE},
+                    0.5),
+            []
+        )
+
+    def test_regressions_reported(self):
+        """Лишний запрос, рост задержки и памяти — регрессии."""
+        current = {'p50_ms': 20, 'p95_ms': 40, 'queries': 4,
+                   'memory_kb': 400}
+        problems = compare(
+            {'posts:index': current}, {'posts:index': REFERENCE}, 0.5
+        )
+        self.assertEqual(len(problems), 3)
+
+    def test_new_url_without_baseline_skipped(self):
+        """Адрес без эталона не сравнивается."""
+        self.assertEqual(compare({'posts:index': REFERENCE}, {}, 0.5), [])
@@ -0,0 +1,23 @@
+from unittest import mock
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+
+from ..cache import check_cache_client, missing_client
+
+
+class CachePresetClientTest(SimpleTestCase):
+    def test_builtin_presets_need_nothing(self):
+        """locmem, file и db работают без дополнительных пакетов."""
+        for name in ('locmem', 'file', 'db'):
+            self.assertIsNone(missing_client(settings.CACHE_PRESETS[name]))
+
+    @override_settings(YATUBE_CACHE='redis')
+    def test_missing_client_stops_startup(self):
+        """Пресет без установленного клиента останавливает запуск."""
+        with mock.patch('core.cache.find_spec', return_value=None):
+            with self.assertRaisesMessage(
+                ImproperlyConfigured, 'pip install django-redis'
+            ):
+                check_cache_client()
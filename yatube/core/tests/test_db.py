@@ -0,0 +1,57 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.db import connections
+from django.test import TransactionTestCase
+
+from ..db import check_connections
+
+ALIAS = 'test_core_db'
+
+
+class ConnectionSettingsTest(TransactionTestCase):
+    # Запросы идут к временной базе, алиас которой появляется только
+    # в setUp; без TransactionTestCase pytest-django их запрещает
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        connections.databases[ALIAS] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': self.path,
+            'CONN_MAX_AGE': 600,
+            'CONN_HEALTH_CHECKS': True,
+            'PRAGMAS': {'journal_mode': 'WAL', 'synchronous': 'NORMAL'},
+        }
+        connections.ensure_defaults(ALIAS)
+        connections.prepare_test_settings(ALIAS)
+
+    def tearDown(self):
+        connections[ALIAS].close()
+        del connections[ALIAS]
+        del connections.databases[ALIAS]
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def pragma(self, name):
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_on_connect(self):
+        """Новое соединение SQLite получает PRAGMAS из настроек."""
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        # NORMAL = 1
+        self.assertEqual(self.pragma('synchronous'), 1)
+
+    def test_unusable_connection_closed(self):
+        """Проверка перед запросом закрывает умершее соединение."""
+        connection = connections[ALIAS]
+        connection.ensure_connection()
+        check_connections()
+        self.assertIsNotNone(connection.connection)
+        with mock.patch.object(connection, 'is_usable', return_value=False):
+            check_connections()
+        self.assertIsNone(connection.connection)
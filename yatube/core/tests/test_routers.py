@@ -0,0 +1,83 @@
+import os
+import sqlite3
+import tempfile
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from posts.models import Post
+
+from ..middleware import PIN_COOKIE, PrimaryPinMiddleware
+from ..replication import copy_database
+from ..routers import ReplicaRouter, use_primary
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def test_reads_go_to_replica_writes_to_default(self):
+        """Чтение идёт в реплику, запись — в default."""
+        with use_primary(False):
+            self.assertEqual(self.router.db_for_read(Post), 'replica1')
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+            # После записи поток читает свои данные из default
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def request(self, method='get', view_writes=False, **cookies):
+        seen = {}
+
+        def view(request):
+            if view_writes:
+                self.router.db_for_write(Post)
+            seen['read'] = self.router.db_for_read(Post)
+            return HttpResponse()
+
+        request = getattr(self.factory, method)('/')
+        request.COOKIES.update(cookies)
+        response = PrimaryPinMiddleware(view)(request)
+        return seen['read'], response
+
+    def test_write_sets_pin_cookie(self):
+        """Запрос с записью ставит куку, по ней читается default."""
+        read, response = self.request('post', view_writes=True)
+        self.assertEqual(read, 'default')
+        self.assertIn(PIN_COOKIE, response.cookies)
+        read, response = self.request(**{PIN_COOKIE: '1'})
+        self.assertEqual(read, 'default')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_plain_read_uses_replica(self):
+        """Обычный GET без куки читает из реплики и куку не ставит."""
+        read, response = self.request()
+        self.assertEqual(read, 'replica1')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_post_reads_from_default(self):
+        """Изменяющий запрос читает из default с самого начала."""
+        read, _ = self.request('post')
+        self.assertEqual(read, 'default')
+
+
+class CopyDatabaseTest(SimpleTestCase):
+    def test_copy_database(self):
+        """Реплика получает снимок основной базы."""
+        directory = tempfile.mkdtemp()
+        source = os.path.join(directory, 'source.sqlite3')
+        target = os.path.join(directory, 'replica.sqlite3')
+        with sqlite3.connect(source) as connection:
+            connection.execute('CREATE TABLE post (text TEXT)')
+            connection.execute("INSERT INTO post VALUES ('Текст')")
+        connection.close()
+        copy_database(source, target)
+        connection = sqlite3.connect(target)
+        self.assertEqual(
+            connection.execute('SELECT text FROM post').fetchall(),
+            [('Текст',)]
+        )
+        connection.close()
+        for path in (source, target):
+            os.remove(path)
+        os.rmdir(directory)
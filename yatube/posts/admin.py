@@ -1,10 +1,39 @@
 from django.contrib import admin
-from .models import Post, Group
+from django.contrib.admin.widgets import ForeignKeyRawIdWidget
+from django.urls import NoReverseMatch, reverse
+from django.utils.text import Truncator
+
+from .models import Follow, Post, Group
+from .pagination import EstimatedCountPaginator
+
+
+class PrefetchedRawIdWidget(ForeignKeyRawIdWidget):
+    """Поле id со ссылкой на поиск, подпись которого берётся у объекта.
+
+    Обычный виджет достаёт выбранный объект отдельным запросом, а в
+    списке постов это запрос на каждую строку. Если в `related` уже
+    лежит объект из select_related, база не нужна.
+    """
+    related = None
+
+    def label_and_url_for_value(self, value):
+        obj = self.related
+        if obj is None or str(obj.pk) != str(value):
+            return super().label_and_url_for_value(value)
+        try:
+            url = reverse(
+                f'{self.admin_site.name}:{obj._meta.app_label}_'
+                f'{obj._meta.model_name}_change',
+                args=(obj.pk,)
+            )
+        except NoReverseMatch:
+            url = ''
+        return Truncator(obj).words(14), url
 
 
 class GroupAdmin(admin.ModelAdmin):
-    list_display = ('title', 'slug', 'description')
-    search_fields = ('description',)
+    list_display = ('title', 'slug', 'description', 'posts_count')
+    search_fields = ('title', 'slug', 'description')
     empty_value_display = '-пусто-'
 
 
@@ -14,11 +43,55 @@ admin.site.register(Group, GroupAdmin)
 class PostAdmin(admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group',)
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    # Вместо выпадающих списков всех групп и пользователей — поле id
+    # с окном поиска
+    raw_id_fields = ('author', 'group')
     search_fields = ('text',)
+    readonly_fields = (
+        'image_width', 'image_height', 'image_size', 'image_format',
+        'image_hash',
+    )
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.raw_id_fields:
+            kwargs['widget'] = PrefetchedRawIdWidget(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using')
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        form_class = super().get_changelist_form(request, **kwargs)
+        raw_id_fields = self.raw_id_fields
+
+        class ChangelistForm(form_class):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                # Строки списка уже выбраны с list_select_related
+                for name in raw_id_fields:
+                    widget = getattr(self.fields.get(name), 'widget', None)
+                    if isinstance(widget, PrefetchedRawIdWidget):
+                        widget.related = getattr(self.instance, name)
+
+        return ChangelistForm
+
 
 admin.site.register(Post, PostAdmin)
 
+
+class FollowAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
+    search_fields = ('user__username', 'author__username')
+
+
+admin.site.register(Follow, FollowAdmin)
+
 # Register your models here.
@@ -0,0 +1,248 @@
+import hashlib
+import time
+from datetime import datetime
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.safestring import mark_safe
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
+
+from core.background import submit_later
+
+VERSION_KEY = 'posts:version:{}'
+FRAGMENT_KEY = 'posts:fragment:{}:{}:{}'
+FRAGMENT_STATS_KEY = 'posts:fragment:{}'
+FRAGMENT_TEMPLATE = 'posts/includes/main.html'
+
+
+def _hash(scope):
+    # Имена пользователей бывают длинными и нелатинскими,
+    # а memcached принимает только короткие ASCII-ключи
+    return hashlib.md5(scope.encode()).hexdigest()
+
+
+def _key(scope):
+    return VERSION_KEY.format(_hash(scope))
+
+
+def _now():
+    return int(time.time() * 1000000)
+
+
+def get_versions(scopes):
+    """Текущие версии областей кэша: {область: версия}.
+
+    Версия — отметка времени последней записи в микросекундах,
+    поэтому вытесненный из кэша счётчик не откатывается назад.
+    """
+    keys = {_key(scope): scope for scope in scopes}
+    found = cache.get_many(keys)
+    versions = {keys[key]: version for key, version in found.items()}
+    missing = {
+        key: _now() for key, scope in keys.items() if scope not in versions
+    }
+    for key, version in missing.items():
+        cache.add(key, version, None)
+    if missing:
+        found = cache.get_many(missing)
+        for key, version in missing.items():
+            versions[keys[key]] = found.get(key, version)
+    return versions
+
+
+def get_version(scope):
+    return get_versions([scope])[scope]
+
+
+def bump_versions(*scopes):
+    """Сдвигает версии, после чего старые ключи больше не читаются."""
+    keys = [_key(scope) for scope in scopes]
+    now = _now()
+    old = cache.get_many(keys)
+    cache.set_many(
+        {key: max(now, old.get(key, 0) + 1) for key in keys}, None
+    )
+
+
+def bump_after_commit(*scopes):
+    """Сдвигает версии сразу и ещё раз после фиксации транзакции.
+
+    Повторный сдвиг сбрасывает страницы, которые успели закэшировать
+    со старыми данными, пока транзакция была открыта.
+    """
+    bump_versions(*scopes)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: bump_versions(*scopes))
+    if settings.DATABASE_REPLICAS:
+        # Пока реплики догоняют, страницы собираются по старым данным
+        transaction.on_commit(lambda: submit_later(
+            settings.DATABASE_REPLICA_LAG, bump_versions, *scopes
+        ))
+
+
+def cache_feed(scope, per_user=False):
+    """Кэширует страницу ленты под ключом с версией области.
+
+    `scope` — шаблон имени области, который заполняется
+    именованными аргументами из URL, например 'group:{slug}'.
+    С `per_user` у каждого пользователя своя копия страницы.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            name = scope.format(**kwargs)
+            key_prefix = f'posts:feed:{_hash(name)}:{get_version(name)}'
+            if per_user:
+                key_prefix += f':{request.user.pk}'
+            cached_view = cache_page(
+                settings.POSTS_FEED_CACHE_TIMEOUT, key_prefix=key_prefix
+            )(view)
+            return cached_view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _request_versions(request, names):
+    # ETag и Last-Modified считаются по одним версиям за запрос
+    versions = request.__dict__.setdefault('_scope_versions', {})
+    missing = [name for name in names if name not in versions]
+    if missing:
+        versions.update(get_versions(missing))
+    return [versions[name] for name in names]
+
+
+def conditional(scope, per_user=False):
+    """condition() с ETag и Last-Modified по версии области кэша.
+
+    Версия сдвигается сигналами при каждой записи, которая меняет
+    данные области, поэтому проверка не ходит в базу. В ETag входят
+    адрес с параметрами (номер страницы, курсор) и, если `per_user`,
+    пользователь — его имя и кнопки есть на странице.
+
+    Если на странице данные нескольких областей, `scope` — функция
+    (request, **kwargs), которая возвращает список их имён.
+    """
+    def names(request, kwargs):
+        if not callable(scope):
+            return [scope.format(**kwargs)]
+        # Функция может ходить в базу, ETag и Last-Modified её не повторяют
+        resolved = request.__dict__.setdefault('_scope_names', {})
+        if scope not in resolved:
+            resolved[scope] = scope(request, **kwargs)
+        return resolved[scope]
+
+    def etag(request, *args, **kwargs):
+        versions = _request_versions(request, names(request, kwargs))
+        raw = f'{":".join(map(str, versions))}:{request.get_full_path()}'
+        if per_user:
+            raw += f':{request.user.pk}'
+        return _hash(raw)
+
+    def last_modified(request, *args, **kwargs):
+        version = max(_request_versions(request, names(request, kwargs)))
+        return datetime.fromtimestamp(version / 10 ** 6, tz=timezone.utc)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def cache_control_by_user(view):
+    """Cache-Control и Vary для страниц, разных у разных пользователей.
+
+    Страницу анонима можно хранить и в общих кэшах вроде CDN, страницу
+    вошедшего пользователя — только в его браузере. В обоих случаях
+    кэш переспрашивает сервер и по ETag получает 304.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        # Срок из cache_page относится к серверному кэшу, не к браузеру
+        if response.has_header('Expires'):
+            del response['Expires']
+        if request.user.is_authenticated:
+            response['Cache-Control'] = 'private, no-cache'
+        else:
+            response['Cache-Control'] = 'public, no-cache'
+        patch_vary_headers(response, ('Cookie',))
+        return response
+    return wrapper
+
+
+def post_scopes(post_id, author_username, group_slug):
+    """Области кэша, которые затрагивает изменение поста."""
+    scopes = ['index', f'post:{post_id}', f'profile:{author_username}']
+    if group_slug:
+        scopes.append(f'group:{group_slug}')
+    return scopes
+
+
+def author_key(author):
+    """Часть ключа фрагмента, зависящая от того, как показан автор."""
+    return _hash(f'{author.username}:{author.get_full_name()}')
+
+
+def count_stat(key, value):
+    """Прибавляет value к счётчику статистики в кэше."""
+    if not value:
+        return
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key, value)
+    except ValueError:
+        # Счётчик вытеснили между add и incr
+        cache.add(key, value, None)
+
+
+def read_stats(key_template, names=('hits', 'misses')):
+    """Счётчики статистики одним get_many: {имя: значение}."""
+    keys = {key_template.format(name): name for name in names}
+    found = cache.get_many(keys)
+    return {name: found.get(key, 0) for key, name in keys.items()}
+
+
+def fragment_stats():
+    """Счётчики попаданий и промахов кэша фрагментов постов."""
+    return read_stats(FRAGMENT_STATS_KEY)
+
+
+def attach_fragments(posts):
+    """Проставляет постам готовую разметку `post.fragment`.
+
+    Разметка берётся из кэша одним get_many по ключам (id, версия,
+    имя автора), отрисовываются только промахи. Имя в ключе, потому
+    что его смена не трогает версии постов автора.
+    """
+    posts = list(posts)
+    if not posts:
+        return
+    versions = get_versions(f'post:{post.pk}' for post in posts)
+    keys = {
+        post.pk: FRAGMENT_KEY.format(
+            post.pk, versions[f'post:{post.pk}'], author_key(post.author)
+        )
+        for post in posts
+    }
+    # thumbnails сам импортирует этот модуль
+    from .thumbnails import prefetch_thumbnails
+
+    found = cache.get_many(keys.values())
+    missing = [post for post in posts if keys[post.pk] not in found]
+    rendered = {}
+    # Миниатюры всех отрисовываемых постов — одним запросом к хранилищу
+    with prefetch_thumbnails((post.image for post in missing), 'post'):
+        for post in missing:
+            rendered[keys[post.pk]] = render_to_string(
+                FRAGMENT_TEMPLATE, {'post': post}
+            )
+    found.update(rendered)
+    for post in posts:
+        post.fragment = mark_safe(found[keys[post.pk]])
+    if rendered:
+        cache.set_many(rendered, settings.POSTS_FRAGMENT_CACHE_TIMEOUT)
+    count_stat(FRAGMENT_STATS_KEY.format('hits'), len(posts) - len(rendered))
+    count_stat(FRAGMENT_STATS_KEY.format('misses'), len(rendered))
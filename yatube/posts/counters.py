@@ -0,0 +1,84 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Coalesce
+
+from .models import Follow, Group, Post, User, UserStats
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарно сдвигает счётчик, не опуская его ниже нуля."""
+    if pk is None or not delta:
+        return
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def _actual_user_stats(user_id):
+    return {
+        'posts_count': Post.objects.filter(author_id=user_id).count(),
+        'followers_count': Follow.objects.filter(author_id=user_id).count(),
+    }
+
+
+def change_user_stat(user_id, field, delta):
+    """Сдвигает счётчик из UserStats, при необходимости заводя строку."""
+    if user_id is None or not delta:
+        return
+    queryset = UserStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    if queryset.update(**{field: F(field) + delta}) or delta < 0:
+        return
+    # Строки ещё нет: заводим её сразу с честными значениями
+    try:
+        with transaction.atomic():
+            UserStats.objects.create(
+                user_id=user_id, **_actual_user_stats(user_id)
+            )
+    except IntegrityError:
+        change_user_stat(user_id, field, delta)
+
+
+def change_user_posts(user_id, delta):
+    change_user_stat(user_id, 'posts_count', delta)
+
+
+def change_user_followers(user_id, delta):
+    change_user_stat(user_id, 'followers_count', delta)
+
+
+def find_drift():
+    """Возвращает расхождения: (объект, поле, хранится, на самом деле)."""
+    drift = []
+    groups = Group.objects.annotate(
+        actual=Count('posts')
+    ).filter(~Q(posts_count=F('actual')))
+    for group in groups:
+        drift.append((group, 'posts_count', group.posts_count, group.actual))
+    for field, related in (('posts_count', 'posts'),
+                           ('followers_count', 'following')):
+        users = User.objects.annotate(
+            actual=Count(related),
+            stored=Coalesce(f'stats__{field}', 0),
+        ).filter(~Q(stored=F('actual')))
+        for user in users:
+            drift.append((user, field, user.stored, user.actual))
+    posts = Post.objects.annotate(
+        actual=Count('comments')
+    ).filter(~Q(comments_count=F('actual')))
+    for post in posts:
+        drift.append((post, 'comments_count', post.comments_count,
+                      post.actual))
+    return drift
+
+
+def fix_drift(drift):
+    for obj, field, stored, actual in drift:
+        if isinstance(obj, User):
+            UserStats.objects.update_or_create(
+                user=obj, defaults={field: actual}
+            )
+        else:
+            type(obj).objects.filter(pk=obj.pk).update(**{field: actual})
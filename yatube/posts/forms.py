@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 from .models import Post, Comment
+from .uploads import normalize_image
 
 User = get_user_model()
 
@@ -10,12 +12,30 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def __init__(self, *args, upload_errors=None, **kwargs):
+        # Ошибки файлов, отброшенных ещё при приёме запроса
+        self.upload_errors = upload_errors or {}
+        super().__init__(*args, **kwargs)
+
     def clean_text(self):
         data = self.cleaned_data['text']
         if data == '':
             raise forms.ValidationError('Поле должно быть заполнено')
         return data
 
+    def clean_image(self):
+        data = self.cleaned_data['image']
+        if isinstance(data, UploadedFile):
+            return normalize_image(data)
+        return data
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for field, message in self.upload_errors.items():
+            if field in self.fields:
+                self.add_error(field, message)
+        return cleaned_data
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
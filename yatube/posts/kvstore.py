@@ -0,0 +1,89 @@
+"""Хранилище ключей sorl-thumbnail с пакетной загрузкой на страницу.
+
+Как стандартное cached_db: значения живут в общем кэше, а база —
+запасной источник. Но каждый {% thumbnail %} спрашивает хранилище
+отдельно, и лента из десяти постов с вариантами srcset даёт десятки
+обращений. Внутри prefetched() все ключи страницы загружаются одним
+get_many, промахи кэша — одним запросом к базе.
+"""
+import threading
+from contextlib import contextmanager
+
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from .cache import count_stat, read_stats
+
+EMPTY_VALUE = cached_db_kvstore.EMPTY_VALUE
+STATS_KEY = 'posts:thumbnail_kv:{}'
+
+
+def kvstore_stats():
+    """Попадания в кэш и обращения к базе хранилища миниатюр."""
+    return read_stats(STATS_KEY)
+
+
+class KVStore(cached_db_kvstore.KVStore):
+    def __init__(self):
+        super().__init__()
+        # Загруженные значения видит только поток, который их загрузил,
+        # и только до конца блока prefetched()
+        self._local = threading.local()
+
+    @property
+    def _prefetched(self):
+        return getattr(self._local, 'values', None)
+
+    @contextmanager
+    def prefetched(self, image_files):
+        """Загружает значения для image_files на время блока."""
+        keys = {add_prefix(image_file.key) for image_file in image_files}
+        previous = self._prefetched
+        values = dict(previous or {})
+        values.update(self._get_many_raw(keys - values.keys()))
+        self._local.values = values
+        try:
+            yield
+        finally:
+            self._local.values = previous
+
+    def _get_many_raw(self, keys):
+        if not keys:
+            return {}
+        values = self.cache.get_many(keys)
+        missing = keys - values.keys()
+        if missing:
+            stored = dict(
+                KVStoreModel.objects.filter(key__in=missing)
+                .values_list('key', 'value')
+            )
+            # Отсутствие в базе тоже кэшируется, как в cached_db
+            loaded = {key: stored.get(key, EMPTY_VALUE) for key in missing}
+            self.cache.set_many(loaded, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+            values.update(loaded)
+        count_stat(STATS_KEY.format('hits'), len(keys) - len(missing))
+        count_stat(STATS_KEY.format('misses'), len(missing))
+        return values
+
+    def _get_raw(self, key):
+        values = self._prefetched
+        if values is not None and key in values:
+            value = values[key]
+        else:
+            value = self._get_many_raw({key})[key]
+        if value == EMPTY_VALUE:
+            return None
+        return value
+
+    def _set_raw(self, key, value):
+        super()._set_raw(key, value)
+        if self._prefetched is not None:
+            self._prefetched[key] = value
+
+    def _delete_raw(self, *keys):
+        super()._delete_raw(*keys)
+        if self._prefetched is not None:
+            for key in keys:
+                self._prefetched.pop(key, None)
@@ -0,0 +1,199 @@
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Count
+
+from posts.models import Comment, Group, Post, User
+
+ALIAS = 'bench_feed_indexes'
+BATCH = 50000
+PER_PAGE = 10
+# Индексы, которые были до составных: по одному на каждый внешний ключ
+OLD_INDEXES = {
+    'bench_post_author': ('posts_post', 'author_id'),
+    'bench_post_group': ('posts_post', 'group_id'),
+    'bench_comment_post': ('posts_comment', 'post_id'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет отдельную базу SQLite миллионом постов и сравнивает '
+        'планы и задержку запросов лент со старыми и составными индексами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10 ** 6)
+        parser.add_argument('--comments', type=int, default=10 ** 5)
+        parser.add_argument('--authors', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--path',
+            help='Файл базы; по умолчанию временный, удаляется в конце.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if path is None:
+            handle, path = tempfile.mkstemp(suffix='.sqlite3')
+            os.close(handle)
+        connections.databases[ALIAS] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': path,
+        }
+        connections.ensure_defaults(ALIAS)
+        connections.prepare_test_settings(ALIAS)
+        try:
+            self.create_schema()
+            self.seed(options)
+            self.stdout.write(self.style.MIGRATE_HEADING('До:'))
+            self.use_old_indexes()
+            self.report(options['repeat'])
+            self.stdout.write(self.style.MIGRATE_HEADING('После:'))
+            self.use_new_indexes()
+            self.report(options['repeat'])
+        finally:
+            connections[ALIAS].close()
+            del connections[ALIAS]
+            del connections.databases[ALIAS]
+            if options['path'] is None:
+                os.remove(path)
+
+    def create_schema(self):
+        connection = connections[ALIAS]
+        with connection.schema_editor() as editor:
+            for model in (User, Group, Post, Comment):
+                editor.create_model(model)
+        # Индексы строятся после заполнения: так и быстрее, и честнее
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' "
+                "AND sql IS NOT NULL AND tbl_name IN "
+                "('posts_post', 'posts_comment')"
+            )
+            for name, in cursor.fetchall():
+                cursor.execute(f'DROP INDEX "{name}"')
+
+    def seed(self, options):
+        rng = random.Random(0)
+        started = datetime(2020, 1, 1)
+        connection = connections[ALIAS]
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode = OFF')
+            cursor.execute('PRAGMA synchronous = OFF')
+            cursor.executemany(
+                'INSERT INTO auth_user (id, password, is_superuser, '
+                'username, first_name, last_name, email, is_staff, '
+                "is_active, date_joined) VALUES (%s, '', 0, %s, '', '', "
+                "'', 0, 1, %s)",
+                [(pk, f'user{pk}', str(started))
+                 for pk in range(1, options['authors'] + 1)],
+            )
+            cursor.executemany(
+                'INSERT INTO posts_group (id, title, slug, description, '
+                "posts_count) VALUES (%s, %s, %s, '', 0)",
+                [(pk, f'Группа {pk}', f'group{pk}')
+                 for pk in range(1, options['groups'] + 1)],
+            )
+            self.insert(
+                cursor,
+                'INSERT INTO posts_post (id, text, pub_date, author_id, '
+                'group_id, image, image_format, image_hash, '
+                "comments_count) VALUES (%s, %s, %s, %s, %s, '', '', '', 0)",
+                options['posts'],
+                lambda pk: (
+                    pk, f'Пост {pk}',
+                    str(started + timedelta(seconds=pk * 30)),
+                    rng.randint(1, options['authors']),
+                    rng.choice((None, rng.randint(1, options['groups']))),
+                ),
+            )
+            # Комментарии ложатся на первые посты, чтобы у них были
+            # длинные обсуждения
+            hot_posts = min(options['posts'], 100)
+            self.insert(
+                cursor,
+                'INSERT INTO posts_comment (id, post_id, author_id, text, '
+                'created) VALUES (%s, %s, %s, %s, %s)',
+                options['comments'],
+                lambda pk: (
+                    pk, rng.randint(1, hot_posts),
+                    rng.randint(1, options['authors']), f'Комментарий {pk}',
+                    str(started + timedelta(seconds=pk * 30)),
+                ),
+            )
+            cursor.execute('CREATE INDEX bench_post_pub_date '
+                           'ON posts_post (pub_date)')
+            cursor.execute('CREATE INDEX bench_comment_created '
+                           'ON posts_comment (created)')
+
+    def insert(self, cursor, sql, total, make_row):
+        for offset in range(0, total, BATCH):
+            rows = range(offset + 1, min(offset + BATCH, total) + 1)
+            cursor.executemany(sql, [make_row(pk) for pk in rows])
+            self.stdout.write(f'{sql.split()[2]}: {rows[-1]}/{total}')
+
+    def use_old_indexes(self):
+        with connections[ALIAS].cursor() as cursor:
+            for name, (table, column) in OLD_INDEXES.items():
+                cursor.execute(f'CREATE INDEX {name} ON {table} ({column})')
+            cursor.execute('ANALYZE')
+
+    def use_new_indexes(self):
+        connection = connections[ALIAS]
+        with connection.cursor() as cursor:
+            for name in OLD_INDEXES:
+                cursor.execute(f'DROP INDEX {name}')
+        with connection.schema_editor() as editor:
+            for model in (Post, Comment):
+                for index in model._meta.indexes:
+                    editor.add_index(model, index)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def feeds(self):
+        posts = Post.objects.using(ALIAS)
+        # Самые многочисленные группа и автор — худший случай для ленты
+        group_id = posts.exclude(group=None).values('group').annotate(
+            total=Count('id')
+        ).order_by('-total').values_list('group', flat=True)[0]
+        author_id = posts.values('author').annotate(
+            total=Count('id')
+        ).order_by('-total').values_list('author', flat=True)[0]
+        group_posts = posts.filter(group_id=group_id)
+        author_posts = posts.filter(author_id=author_id)
+        return {
+            'index': posts.select_related('author', 'group'),
+            'group_posts': group_posts.select_related('author'),
+            'group_posts, курсор': group_posts.select_related(
+                'author'
+            ).order_by('-pub_date', '-id'),
+            'profile': author_posts.select_related('group'),
+            'profile, курсор': author_posts.select_related(
+                'group'
+            ).order_by('-pub_date', '-id'),
+            'post_detail, комментарии': Comment.objects.using(ALIAS).filter(
+                post_id=1
+            ).select_related('author').order_by('created', 'id'),
+        }
+
+    def report(self, repeat):
+        for name, queryset in self.feeds().items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                # Каждый раз новый срез: выполненный queryset кэширует строки
+                list(queryset[:PER_PAGE])
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f'{name}: {statistics.median(timings):.2f} мс (медиана)'
+            )
+            for line in queryset[:PER_PAGE].explain().splitlines():
+                self.stdout.write(f'    {line}')
@@ -0,0 +1,137 @@
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from posts.models import Follow, Post, User, UserStats
+from posts.timeline import fan_out_post, follow_feed, rebuild_timeline
+
+PER_PAGE = 10
+
+
+class Command(BaseCommand):
+    help = (
+        'Во временной тестовой базе сравнивает ленту подписок через '
+        'соединение с Follow и через разложенные TimelineEntry, '
+        'а также стоимость раскладки поста популярного автора.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--authors', type=int, default=10000,
+            help='Сколько авторов в подписках у читателя.',
+        )
+        parser.add_argument('--posts-per-author', type=int, default=5)
+        parser.add_argument(
+            '--followers', type=int, default=10000,
+            help='Сколько подписчиков у популярного автора.',
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        # Популярный автор «тянущийся», остальные раскладываются
+        pulled = override_settings(
+            POSTS_FANOUT_MAX_FOLLOWERS=options['followers']
+        )
+        try:
+            with pulled:
+                reader, star = self.seed(options)
+                started = time.perf_counter()
+                rebuild_timeline(reader.pk)
+                self.stdout.write(
+                    f'Сборка ленты читателя: '
+                    f'{(time.perf_counter() - started) * 1000:.0f} мс'
+                )
+                self.report_feeds(reader, options['repeat'])
+                self.report_fan_out(star)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def seed(self, options):
+        authors = options['authors']
+        followers = options['followers']
+        now = timezone.make_aware(datetime(2021, 1, 1))
+        users = [
+            User(username=f'user{pk}', password='')
+            for pk in range(authors + followers + 2)
+        ]
+        User.objects.bulk_create(users)
+        users = list(User.objects.order_by('pk'))
+        reader, star = users[0], users[1]
+        writers = users[2:authors + 2]
+        audience = users[authors + 2:]
+        Follow.objects.bulk_create(
+            [Follow(user=reader, author=author)
+             for author in writers + [star]]
+            + [Follow(user=user, author=star) for user in audience],
+        )
+        UserStats.objects.bulk_create(
+            [UserStats(user=author, followers_count=1) for author in writers]
+            + [UserStats(user=star, followers_count=len(audience) + 1)],
+        )
+        posts = []
+        for number in range(options['posts_per_author']):
+            for offset, author in enumerate(writers + [star]):
+                posts.append(Post(
+                    text=f'Пост {number}',
+                    author=author,
+                    pub_date=now + timedelta(
+                        seconds=number * len(writers) + offset
+                    ),
+                ))
+        Post.objects.bulk_create(posts)
+        self.stdout.write(
+            f'Авторов в подписках: {len(writers) + 1}, постов: {len(posts)}, '
+            f'подписчиков у популярного автора: {len(audience) + 1}'
+        )
+        return reader, star
+
+    def feeds(self, reader):
+        return {
+            'соединение с Follow': Post.objects.filter(
+                author__following__user=reader
+            ).select_related('author', 'group'),
+            'разложенная лента': follow_feed(reader).select_related(
+                'author', 'group'
+            ),
+        }
+
+    def report_feeds(self, reader, repeat):
+        for name, queryset in self.feeds(reader).items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                # Страница ленты — это срез и COUNT(*) для пагинатора
+                list(queryset[:PER_PAGE])
+                queryset.count()
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f'{name}: {statistics.median(timings):.2f} мс (медиана)'
+            )
+            for line in queryset[:PER_PAGE].explain().splitlines():
+                self.stdout.write(f'    {line}')
+
+    def report_fan_out(self, star):
+        for name, limit in (('раскладка', 10 ** 9), ('подмешивание', None)):
+            # bulk_create не шлёт post_save, раскладка запускается вручную
+            Post.objects.bulk_create([Post(text='Новый пост', author=star)])
+            post = Post.objects.filter(author=star).latest('pk')
+            overrides = {} if limit is None else {
+                'POSTS_FANOUT_MAX_FOLLOWERS': limit
+            }
+            with override_settings(**overrides):
+                started = time.perf_counter()
+                processed = fan_out_post(post.pk)
+                elapsed = (time.perf_counter() - started) * 1000
+            self.stdout.write(
+                f'Публикация популярного автора, {name}: {elapsed:.0f} мс, '
+                f'подписчиков обработано: {processed}'
+            )
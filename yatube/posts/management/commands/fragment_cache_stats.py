@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts.cache import fragment_stats
+from posts.kvstore import kvstore_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает попадания и промахи кэша фрагментов постов '
+        'и хранилища сведений о миниатюрах.'
+    )
+
+    def handle(self, *args, **options):
+        for title, stats in (
+            ('Фрагменты постов', fragment_stats()),
+            ('Миниатюры', kvstore_stats()),
+        ):
+            total = stats['hits'] + stats['misses']
+            ratio = stats['hits'] / total if total else 0
+            self.stdout.write(
+                f'{title}: попаданий {stats["hits"]}, '
+                f'промахов {stats["misses"]}, доля попаданий: {ratio:.1%}'
+            )
@@ -0,0 +1,82 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from posts.models import Post
+from posts.uploads import image_metadata
+
+METADATA_FIELDS = (
+    'image_width', 'image_height', 'image_size', 'image_format', 'image_hash'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Записывает размеры, вес, формат и хэш картинок постам, '
+        'у которых их ещё нет, и показывает одинаковые картинки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Сколько постов читать и обновлять за раз.',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересчитать и посты, у которых данные уже есть.',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').order_by('pk')
+        if not options['force']:
+            posts = posts.filter(image_hash='')
+        posts = posts.only('pk', 'image', *METADATA_FIELDS)
+        last_id = 0
+        updated = 0
+        failed = []
+        while True:
+            # Страницы по id: обновлённые посты выпадают из выборки,
+            # и смещение поехало бы
+            batch = list(
+                posts.filter(pk__gt=last_id)[:options['batch_size']]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].pk
+            changed = []
+            for post in batch:
+                try:
+                    with post.image.open('rb'):
+                        metadata = image_metadata(post.image)
+                except OSError as error:
+                    failed.append(post.pk)
+                    self.stderr.write(f'Пост #{post.pk}: {error}')
+                    continue
+                for field, value in metadata.items():
+                    setattr(post, field, value)
+                changed.append(post)
+            Post.objects.bulk_update(changed, METADATA_FIELDS)
+            updated += len(changed)
+            self.stdout.write(f'Обновлено постов: {updated}')
+        if failed:
+            self.stdout.write(self.style.WARNING(
+                f'Не удалось прочитать картинки постов: {failed}'
+            ))
+        self.report_duplicates()
+        self.stdout.write(self.style.SUCCESS('Готово.'))
+
+    def report_duplicates(self):
+        duplicates = (
+            Post.objects.exclude(image_hash='')
+            .values('image_hash')
+            .annotate(posts=Count('pk'))
+            .filter(posts__gt=1)
+            .order_by('-posts')
+        )
+        for row in duplicates:
+            self.stdout.write(
+                f'Одинаковые картинки у {row["posts"]} постов: '
+                f'{row["image_hash"][:12]}…'
+            )
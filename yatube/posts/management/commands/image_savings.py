@@ -0,0 +1,77 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageOps
+from sorl.thumbnail.conf import settings as sorl_settings
+
+from posts.thumbnails import get_size, get_variants
+
+
+class Command(BaseCommand):
+    help = (
+        'Считает, сколько байт экономят варианты миниатюр по сравнению '
+        'с единственным JPEG, который отдавался раньше.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', default='post')
+        parser.add_argument(
+            '--path',
+            default=os.path.join(settings.MEDIA_ROOT, 'posts'),
+            help='Каталог с исходными картинками.',
+        )
+
+    def handle(self, *args, **options):
+        geometry, _ = get_size(options['size'])
+        base = tuple(int(side) for side in geometry.split('x'))
+        variants = get_variants(options['size'])
+        baseline_total = 0
+        totals = {(width, opts['format']): 0 for width, _, opts in variants}
+        count = 0
+        for name, path in self.walk(options['path']):
+            try:
+                with Image.open(path) as source:
+                    source = ImageOps.exif_transpose(source).convert('RGB')
+                    baseline_total += self.encoded_size(source, base, 'JPEG')
+                    for width, variant, opts in variants:
+                        size = tuple(int(side) for side in variant.split('x'))
+                        totals[width, opts['format']] += self.encoded_size(
+                            source, size, opts['format']
+                        )
+            except (OSError, ValueError):
+                self.stderr.write(f'Пропущен {name}: не картинка')
+                continue
+            count += 1
+        if not count:
+            self.stdout.write('Картинок не найдено.')
+            return
+        self.stdout.write(
+            f'Картинок: {count}. Сейчас отдаётся JPEG {geometry}: '
+            f'{baseline_total} байт.'
+        )
+        for (width, image_format), total in totals.items():
+            saved = baseline_total - total
+            self.stdout.write(
+                f'{image_format:<5} {width:>5}w: {total:>10} байт, '
+                f'экономия {saved:>10} байт ({saved / baseline_total:.0%})'
+            )
+
+    @staticmethod
+    def walk(root):
+        """Файлы под root с подкаталогами posts/ab/cd/: (имя, путь)."""
+        found = []
+        for directory, _, files in os.walk(root):
+            for file_name in files:
+                path = os.path.join(directory, file_name)
+                found.append((os.path.relpath(path, root), path))
+        return sorted(found)
+
+    @staticmethod
+    def encoded_size(source, size, image_format):
+        buffer = BytesIO()
+        ImageOps.fit(source, size).save(
+            buffer, image_format, quality=sorl_settings.THUMBNAIL_QUALITY
+        )
+        return buffer.tell()
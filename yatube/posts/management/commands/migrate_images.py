@@ -0,0 +1,165 @@
+import posixpath
+import time
+
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from posts.cache import bump_after_commit, post_scopes
+from posts.models import Post
+from posts.storage import (
+    TRASH_DIR, post_images, purge_trash, release_image
+)
+from posts.thumbnails import build_thumbnails
+from posts.uploads import image_metadata
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов под имена по содержимому в раскладке '
+        'posts/ab/cd/: одинаковые файлы сливаются в один, старые файлы '
+        'и их миниатюры удаляются. Можно запускать на работающем сайте: '
+        'пост переключается на новый файл, когда миниатюры уже готовы. '
+        'Старые файлы уходят в корзину и удаляются командой '
+        'purge_image_trash или сразу с --purge.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Сколько постов просматривать за раз.',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help='Пауза между пачками в секундах, чтобы не нагружать диск.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только посчитать, что будет перенесено.',
+        )
+        parser.add_argument(
+            '--purge',
+            action='store_true',
+            help=(
+                'После переноса сразу очистить корзину, не дожидаясь '
+                'POSTS_IMAGE_TRASH_GRACE. Удаляет и файлы, освобождённые '
+                'сайтом: их не удастся вернуть, если ссылка на них '
+                'появится позже.'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.moved = 0
+        self.reclaimed = 0
+        # Новые имена, под которые уже что-то перенесено в этом прогоне
+        self.targets = set()
+        self.failed = []
+        rows = (
+            Post.objects.exclude(image='')
+            .order_by('pk')
+            .values_list('pk', 'image')
+        )
+        last_id = 0
+        while True:
+            batch = list(rows.filter(pk__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            for name in dict.fromkeys(name for _, name in batch):
+                try:
+                    self.migrate(name)
+                except OSError as error:
+                    self.failed.append(name)
+                    self.stderr.write(f'{name}: {error}')
+            if not self.dry_run:
+                self.stdout.write(f'Перенесено файлов: {self.moved}')
+            time.sleep(options['pause'])
+        self.purged = None
+        if options['purge'] and not self.dry_run:
+            self.purged = purge_trash(0)
+        self.report()
+
+    def report(self):
+        verb = 'Будет перенесено' if self.dry_run else 'Перенесено'
+        self.stdout.write(f'{verb} файлов: {self.moved}.')
+        if self.failed:
+            self.stdout.write(self.style.WARNING(
+                f'Не удалось прочитать: {", ".join(self.failed)}'
+            ))
+        reclaimed = filesizeformat(self.reclaimed)
+        if self.dry_run:
+            self.stdout.write(self.style.SUCCESS(
+                f'Освободится за счёт дубликатов: {reclaimed}.'
+            ))
+        elif self.purged is not None:
+            self.stdout.write(self.style.SUCCESS(
+                f'Освобождено за счёт дубликатов: {reclaimed}, удалено '
+                f'из корзины файлов: {self.purged}.'
+            ))
+        else:
+            # Отложенное удаление из release_image живёт в потоке этого
+            # процесса и не переживёт завершения команды
+            self.stdout.write(self.style.SUCCESS(
+                f'Дубликаты занимают {reclaimed}. Старые файлы лежат в '
+                f'{TRASH_DIR}/ и освободят место, когда их удалит '
+                'purge_image_trash по истечении POSTS_IMAGE_TRASH_GRACE '
+                '(или запустите с --purge).'
+            ))
+
+    def migrate(self, name):
+        """Переносит файл name и переключает на него все посты.
+
+        Порядок такой, чтобы страницы не остались без картинки: копия
+        под новым именем, миниатюры для неё, обновление постов, сброс
+        их кэша и только потом удаление старого файла.
+        """
+        upload_name = Post._meta.get_field('image').generate_filename(
+            None, posixpath.basename(name)
+        )
+        digest = post_images.name_digest(name)
+        metadata = None
+        if digest is None:
+            # Старое имя из загрузки: хэш узнаём, прочитав файл
+            with post_images.open(name) as file:
+                metadata = image_metadata(file)
+            digest = metadata['image_hash']
+        target = post_images.content_name(upload_name, digest)
+        if target == name:
+            return
+        size = post_images.size(name)
+        existed = target in self.targets or post_images.exists(target)
+        if existed:
+            self.reclaimed += size
+        self.targets.add(target)
+        self.moved += 1
+        if self.dry_run:
+            return
+        if not post_images.exists(target):
+            with post_images.open(name) as file:
+                target = post_images.save(upload_name, file)
+        posts = list(
+            Post.objects.filter(image=name).select_related('author', 'group')
+        )
+        if posts:
+            self.switch(posts, name, target, metadata)
+        release_image(name)
+
+    def switch(self, posts, name, target, metadata):
+        post = posts[0]
+        changes = dict(metadata or {}, image=target)
+        for field, value in changes.items():
+            setattr(post, field, value)
+        build_thumbnails(post.image)
+        # Только посты, которые всё ещё ссылаются на старый файл
+        Post.objects.filter(image=name).update(**changes)
+        for post in posts:
+            bump_after_commit(*post_scopes(
+                post.pk,
+                post.author.username,
+                post.group.slug if post.group_id else None
+            ))
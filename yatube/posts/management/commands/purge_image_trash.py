@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.storage import purge_trash
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из корзины картинки, на которые так и не появилось '
+        'ссылок, вместе с их миниатюрами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=settings.POSTS_IMAGE_TRASH_GRACE,
+            help='Удалять файлы, пролежавшие в корзине дольше, секунд.',
+        )
+
+    def handle(self, *args, **options):
+        purged = purge_trash(options['grace'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Удалено из корзины файлов: {purged}.')
+        )
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import find_drift, fix_drift
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов и комментариев с нуля.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не исправляя.',
+        )
+
+    def handle(self, *args, **options):
+        drift = find_drift()
+        for obj, field, stored, actual in drift:
+            self.stdout.write(
+                f'{obj._meta.label} #{obj.pk} {field}: '
+                f'хранится {stored}, на самом деле {actual}'
+            )
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет.'))
+            return
+        if options['dry_run']:
+            self.stdout.write(
+                self.style.WARNING(f'Найдено расхождений: {len(drift)}.')
+            )
+            return
+        fix_drift(drift)
+        self.stdout.write(
+            self.style.SUCCESS(f'Исправлено расхождений: {len(drift)}.')
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import get_backend
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново строит поисковый индекс постов, например после массового '
+        'update(), который обходит сигналы.'
+    )
+
+    def handle(self, *args, **options):
+        get_backend(write=True).rebuild()
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен.'))
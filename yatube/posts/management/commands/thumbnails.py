@@ -0,0 +1,216 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as sorl_settings
+
+from posts.models import Post
+from posts.thumbnails import (
+    generate_thumbnails, get_ready_thumbnail, get_ready_variants, get_variants
+)
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_EVERY = 50
+
+
+def _init_worker():
+    # При запуске через spawn дочерний процесс настраивает Django сам
+    django.setup()
+    connections.close_all()
+
+
+def _warm_post(post_id):
+    try:
+        if not generate_thumbnails(post_id):
+            return post_id, 'нет файла картинки'
+    except Exception as error:
+        logger.exception('Не удалось построить миниатюры поста %s', post_id)
+        return post_id, str(error)
+    return post_id, None
+
+
+def _is_warm(post):
+    if get_ready_thumbnail(post.image, 'post') is None:
+        return False
+    expected = sum(
+        len(get_variants(size)) for size in settings.POSTS_THUMBNAILS
+    )
+    ready = sum(
+        len(thumbnails)
+        for size in settings.POSTS_THUMBNAILS
+        for thumbnails in get_ready_variants(post.image, size).values()
+    )
+    return ready == expected
+
+
+class Command(BaseCommand):
+    help = (
+        'warm — строит недостающие миниатюры всех постов на всех ядрах; '
+        'sweep — удаляет миниатюры и записи хранилища ключей sorl, '
+        'у которых больше нет исходной картинки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=('warm', 'sweep'))
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Показать, что будет сделано, ничего не меняя.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Число процессов для warm (по умолчанию — число ядер).',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Продолжить warm с поста после сохранённой отметки.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default=os.path.join(settings.BASE_DIR, '.thumbnails-warm'),
+            help='Файл с id последнего обработанного поста.',
+        )
+
+    def handle(self, *args, **options):
+        if options['action'] == 'warm':
+            self.warm(options)
+        else:
+            self.sweep(options['dry_run'])
+
+    def read_checkpoint(self, path):
+        try:
+            with open(path) as checkpoint:
+                return int(checkpoint.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def write_checkpoint(self, path, post_id):
+        with open(path, 'w') as checkpoint:
+            checkpoint.write(str(post_id))
+
+    def warm(self, options):
+        posts = Post.objects.exclude(image='').order_by('pk')
+        last_id = None
+        if options['resume']:
+            last_id = self.read_checkpoint(options['checkpoint'])
+            if last_id is not None:
+                self.stdout.write(f'Продолжаем после поста #{last_id}.')
+                posts = posts.filter(pk__gt=last_id)
+        if options['dry_run']:
+            cold = [
+                post.pk for post in posts.only('pk', 'image')
+                if not _is_warm(post)
+            ]
+            self.stdout.write(f'Миниатюры нужно построить для {len(cold)} '
+                              f'постов: {cold}')
+            return
+        post_ids = list(posts.values_list('pk', flat=True))
+        total = len(post_ids)
+        failed = []
+        checkpoint = last_id or 0
+        for done, (post_id, error) in enumerate(
+            self.run(post_ids, options['workers']), 1
+        ):
+            if error:
+                failed.append(post_id)
+                self.stderr.write(f'Пост #{post_id}: {error}')
+            elif not failed:
+                # Результаты идут по порядку id; после первой ошибки
+                # отметка стоит, чтобы --resume повторил упавший пост
+                checkpoint = post_id
+            self.write_checkpoint(options['checkpoint'], checkpoint)
+            if done % PROGRESS_EVERY == 0 or done == total:
+                self.stdout.write(f'Обработано постов: {done}/{total}')
+        if failed:
+            self.stdout.write(self.style.WARNING(
+                f'Не удалось обработать посты: {failed}'
+            ))
+        elif os.path.exists(options['checkpoint']):
+            os.remove(options['checkpoint'])
+        self.stdout.write(self.style.SUCCESS('Прогрев закончен.'))
+
+    def run(self, post_ids, workers):
+        if workers <= 1:
+            yield from map(_warm_post, post_ids)
+            return
+        # Соединения с БД не должны достаться дочерним процессам
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker
+        ) as pool:
+            yield from pool.map(_warm_post, post_ids, chunksize=8)
+
+    def sweep(self, dry_run):
+        prefix = sorl_settings.THUMBNAIL_PREFIX
+        orphan_keys = self.sweep_sources(prefix, dry_run)
+        referenced = self.sweep_thumbnail_keys(prefix, orphan_keys, dry_run)
+        removed = 0
+        for name in self.walk(default.storage, prefix.rstrip('/')):
+            if name in referenced:
+                continue
+            self.stdout.write(f'Лишний файл: {name}')
+            removed += 1
+            if not dry_run:
+                default.storage.delete(name)
+        verb = 'Будет удалено' if dry_run else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(f'{verb} файлов: {removed}.'))
+
+    def sweep_sources(self, prefix, dry_run):
+        """Убирает исходники, которых нет на диске, вместе с миниатюрами.
+
+        Возвращает ключи миниатюр таких исходников.
+        """
+        kvstore = default.kvstore
+        orphan_keys = set()
+        for key in list(kvstore._find_keys(identity='image')):
+            image_file = kvstore._get(key)
+            if image_file is None or image_file.name.startswith(prefix):
+                continue
+            if image_file.exists():
+                continue
+            self.stdout.write(f'Нет исходника: {image_file.name}')
+            orphan_keys.update(
+                kvstore._get(key, identity='thumbnails') or []
+            )
+            if not dry_run:
+                kvstore.delete(image_file)
+        return orphan_keys
+
+    def sweep_thumbnail_keys(self, prefix, orphan_keys, dry_run):
+        """Убирает записи о пропавших файлах миниатюр.
+
+        Возвращает имена миниатюр, на которые есть живые записи.
+        """
+        kvstore = default.kvstore
+        referenced = set()
+        for key in list(kvstore._find_keys(identity='image')):
+            image_file = kvstore._get(key)
+            if image_file is None or not image_file.name.startswith(prefix):
+                continue
+            if key in orphan_keys:
+                continue
+            if image_file.exists():
+                referenced.add(image_file.name)
+                continue
+            self.stdout.write(f'Нет файла миниатюры: {image_file.name}')
+            if not dry_run:
+                kvstore.delete(image_file, delete_thumbnails=False)
+        return referenced
+
+    def walk(self, storage, path):
+        if not storage.exists(path):
+            return
+        directories, files = storage.listdir(path)
+        for name in files:
+            yield f'{path}/{name}'
+        for directory in directories:
+            yield from self.walk(storage, f'{path}/{directory}')
@@ -0,0 +1,56 @@
+# Generated by Django 2.2.16 on 2026-10-17 05:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    UserStats = apps.get_model('posts', 'UserStats')
+    groups = Group.objects.using(alias)
+    posts = Post.objects.using(alias)
+    for group in groups.annotate(actual=Count('posts')):
+        groups.filter(pk=group.pk).update(posts_count=group.actual)
+    for post in posts.annotate(actual=Count('comments')):
+        posts.filter(pk=post.pk).update(comments_count=post.actual)
+    authors = posts.order_by().values('author_id').annotate(
+        actual=Count('id')
+    )
+    UserStats.objects.using(alias).bulk_create(
+        UserStats(user_id=row['author_id'], posts_count=row['actual'])
+        for row in authors
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0008_auto_20220402_2215'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число постов'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число комментариев'),
+        ),
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
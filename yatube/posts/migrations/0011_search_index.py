@@ -0,0 +1,47 @@
+from django.db import migrations
+
+from posts.stemmer import stems
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX posts_post_text_search ON posts_post '
+            "USING GIN (to_tsvector('russian', text))"
+        )
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE posts_post_fts USING fts5(stems)'
+        )
+        Post = apps.get_model('posts', 'Post')
+        rows = [
+            (post_id, ' '.join(stems(text)))
+            for post_id, text in Post.objects.using(
+                connection.alias
+            ).values_list('pk', 'text').iterator()
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO posts_post_fts (rowid, stems) VALUES (%s, %s)',
+                rows
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX posts_post_text_search')
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from .storage import post_images
+
 User = get_user_model()
 
 
@@ -11,6 +13,11 @@ class Group(models.Model):
     title = models.CharField('Заголовочек', max_length=200)
     slug = models.SlugField('Слаг адрес', unique=True)
     description = models.TextField('Описание группы')
+    posts_count = models.PositiveIntegerField(
+        'Число постов',
+        default=0,
+        editable=False
+    )
 
     def __str__(self):
         return self.title
@@ -27,7 +34,9 @@ class Post(models.Model):
         User,
         on_delete=models.CASCADE,
         related_name='posts',
-        verbose_name='Автор поста'
+        verbose_name='Автор поста',
+        # Поиск по автору покрывает составной индекс из Meta
+        db_index=False
     )
     group = models.ForeignKey(
         Group,
@@ -35,16 +44,70 @@ class Post(models.Model):
         null=True,
         on_delete=models.SET_NULL,
         related_name='posts',
-        verbose_name='Могучие группы'
+        verbose_name='Могучие группы',
+        db_index=False
     )
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
-        blank=True
+        storage=post_images,
+        blank=True,
+        # По имени файла считаются ссылки на него
+        db_index=True
+    )
+    # Заполняются при сохранении картинки, чтобы не открывать файл
+    # ради размеров; для старых постов — командой image_metadata
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    image_size = models.PositiveIntegerField(
+        'Вес картинки, байт',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    image_format = models.CharField(
+        'Формат картинки',
+        max_length=10,
+        blank=True,
+        editable=False
+    )
+    image_hash = models.CharField(
+        'SHA-256 картинки',
+        max_length=64,
+        blank=True,
+        editable=False,
+        db_index=True
+    )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False
     )
 
     class Meta:
         ordering = ['-pub_date']
+        # Ленты группы и профиля фильтруют по внешнему ключу и сортируют
+        # по дате, а курсор ещё и по id — индекс отдаёт строки готовыми
+        indexes = [
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:TEXT_IN_FIELD]
@@ -57,6 +120,7 @@ class Comment(models.Model):
         blank=True,
         null=True,
         related_name='comments',
+        db_index=False
     )
     author = models.ForeignKey(
         User,
@@ -71,3 +135,103 @@ class Comment(models.Model):
         db_index=True
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='comment_post_created_idx',
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, которые дорого считать на лету."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков',
+        default=0
+    )
+
+    def __str__(self):
+        return f'{self.user}: {self.posts_count}'
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower',
+        verbose_name='Подписчик',
+        # Поиск по подписчику покрывает уникальный индекс
+        db_index=False
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following',
+        verbose_name='Автор'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow',
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='no_self_follow',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} -> {self.author}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписок пользователя, разложенный при публикации.
+
+    Автор и дата копируются из поста, чтобы лента читалась по одному
+    индексу, а отписка удаляла записи без соединения с постами.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель',
+        db_index=False
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор поста',
+        db_index=False
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx',
+            ),
+        ]
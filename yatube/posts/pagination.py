@@ -0,0 +1,229 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+NEXT = 'n'
+PREVIOUS = 'p'
+# Ниже этого числа строк точный COUNT(*) дёшев и считается как обычно
+ESTIMATE_THRESHOLD = 10000
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPage:
+    """Страница ленты для постраничного вывода по курсору.
+
+    Повторяет ту часть интерфейса `django.core.paginator.Page`,
+    которой пользуются шаблоны: перебор, длина и has_*-методы.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if not self.has_next():
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1], NEXT)
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous():
+            return None
+        return self.paginator.encode_cursor(self.object_list[0], PREVIOUS)
+
+
+class CursorPaginator:
+    """Пагинация по ключу (keyset) вместо OFFSET и COUNT(*).
+
+    Страница выбирается условием по полям сортировки, поэтому любая
+    страница стоит столько же, сколько первая. Последнее поле
+    в `ordering` должно быть уникальным, обычно это `id`.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-pub_date', '-id')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = ordering
+        self.fields = [name.lstrip('-') for name in ordering]
+
+    def get_page(self, cursor=None):
+        """Возвращает страницу по курсору, при ошибке — первую."""
+        if cursor:
+            try:
+                direction, values = self.decode_cursor(cursor)
+            except InvalidCursor:
+                pass
+            else:
+                return self._page_from(direction, values)
+        objects = list(self.queryset.order_by(*self.ordering)
+                       [:self.per_page + 1])
+        return CursorPage(
+            objects[:self.per_page], self,
+            has_next=len(objects) > self.per_page,
+            has_previous=False,
+        )
+
+    def _page_from(self, direction, values):
+        if direction == NEXT:
+            ordering = self.ordering
+        else:
+            ordering = [self._reverse(name) for name in self.ordering]
+        queryset = self.queryset.filter(self._seek(ordering, values))
+        objects = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        has_more = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        if direction == NEXT:
+            return CursorPage(objects, self, has_more, has_previous=True)
+        objects.reverse()
+        return CursorPage(objects, self, has_next=True, has_previous=has_more)
+
+    def _seek(self, ordering, values):
+        """Условие «строго после values» для заданной сортировки."""
+        condition = Q()
+        equal = {}
+        for name, value in zip(ordering, values):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        return condition
+
+    @staticmethod
+    def _reverse(name):
+        return name[1:] if name.startswith('-') else f'-{name}'
+
+    def _model_field(self, name):
+        opts = self.queryset.model._meta
+        if name == 'pk':
+            return opts.pk
+        return opts.get_field(name)
+
+    def encode_cursor(self, obj, direction):
+        values = [
+            self._model_field(name).value_to_string(obj)
+            for name in self.fields
+        ]
+        data = json.dumps([direction, values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, raw_values = json.loads(
+                base64.urlsafe_b64decode(padded.encode())
+            )
+            if direction not in (NEXT, PREVIOUS):
+                raise InvalidCursor(cursor)
+            if len(raw_values) != len(self.fields):
+                raise InvalidCursor(cursor)
+            values = [
+                self._model_field(name).to_python(value)
+                for name, value in zip(self.fields, raw_values)
+            ]
+        except (binascii.Error, TypeError, ValueError, ValidationError):
+            raise InvalidCursor(cursor)
+        if None in values:
+            raise InvalidCursor(cursor)
+        return direction, values
+
+
+def estimate_count(model, alias):
+    """Примерное число строк таблицы без её обхода или None.
+
+    PostgreSQL хранит оценку в pg_class, в SQLite берётся наибольший
+    первичный ключ — удалённые строки дают небольшой перебор.
+    """
+    connection = connections[alias]
+    quote = connection.ops.quote_name
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s', [table]
+            )
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                f'SELECT MAX({quote(model._meta.pk.column)}) '
+                f'FROM {quote(table)}'
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator, который не считает COUNT(*) по всей большой таблице.
+
+    Для выборки без фильтров берётся оценка из estimate_count,
+    отфильтрованные выборки и небольшие таблицы считаются точно.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+def elided_page_range(paginator, number, on_each_side=2, on_ends=1):
+    """Номера страниц вокруг текущей и по краям, разрывы — None.
+
+    Как Paginator.get_elided_page_range из новых версий Django: число
+    ссылок не зависит от числа страниц, сколько бы постов ни было.
+    """
+    num_pages = paginator.num_pages
+    if num_pages <= (on_each_side + on_ends) * 2 + 1:
+        yield from paginator.page_range
+        return
+    if number > 1 + on_each_side + on_ends + 1:
+        yield from range(1, on_ends + 1)
+        yield None
+        start = number - on_each_side
+    else:
+        start = 1
+    if number < num_pages - on_each_side - on_ends - 1:
+        yield from range(start, number + on_each_side + 1)
+        yield None
+        yield from range(num_pages - on_ends + 1, num_pages + 1)
+    else:
+        yield from range(start, num_pages + 1)
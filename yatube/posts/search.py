@@ -0,0 +1,204 @@
+from django.db import connections, router
+
+from .models import Post
+from .stemmer import stems
+
+FTS_TABLE = 'posts_post_fts'
+REBUILD_BATCH = 1000
+
+
+class SqliteSearch:
+    """Полнотекстовый индекс FTS5 по основам слов поста.
+
+    FTS5 не знает русской морфологии, поэтому и текст, и запрос
+    проходят через стеммер, а каждое слово запроса ищется как префикс.
+    Ранжирование — встроенный bm25.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def index(self, post_id, text):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, stems) VALUES (%s, %s)',
+                [post_id, ' '.join(stems(text))]
+            )
+
+    def remove(self, post_id):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+    def rebuild(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            posts = Post.objects.using(self.connection.alias).order_by(
+                'pk'
+            ).values_list('pk', 'text')
+            batch = []
+            for post_id, text in posts.iterator(chunk_size=REBUILD_BATCH):
+                batch.append((post_id, ' '.join(stems(text))))
+                if len(batch) == REBUILD_BATCH:
+                    self._insert(cursor, batch)
+                    batch = []
+            self._insert(cursor, batch)
+
+    @staticmethod
+    def _insert(cursor, rows):
+        if rows:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, stems) VALUES (%s, %s)',
+                rows
+            )
+
+    @staticmethod
+    def _match(query):
+        return ' '.join(f'"{word}"*' for word in stems(query))
+
+    def count(self, query):
+        match = self._match(query)
+        if not match:
+            return 0
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s',
+                [match]
+            )
+            return cursor.fetchone()[0]
+
+    def ids(self, query, offset, limit):
+        match = self._match(query)
+        if not match:
+            return []
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY rank, rowid DESC LIMIT %s OFFSET %s',
+                [match, limit, offset]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearch:
+    """Поиск по tsvector с русской конфигурацией.
+
+    Выражение совпадает с GIN-индексом из миграции, так что индекс
+    обновляет сама база, а морфологию даёт словарь russian.
+    """
+
+    VECTOR = "to_tsvector('russian', text)"
+    QUERY = "plainto_tsquery('russian', %s)"
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def index(self, post_id, text):
+        pass
+
+    def remove(self, post_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def count(self, query):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM posts_post '
+                f'WHERE {self.VECTOR} @@ {self.QUERY}',
+                [query]
+            )
+            return cursor.fetchone()[0]
+
+    def ids(self, query, offset, limit):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT id FROM posts_post '
+                f'WHERE {self.VECTOR} @@ {self.QUERY} '
+                f'ORDER BY ts_rank({self.VECTOR}, {self.QUERY}) DESC, id DESC '
+                f'LIMIT %s OFFSET %s',
+                [query, query, limit, offset]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class ScanSearch:
+    """Запасной вариант для прочих баз: icontains по каждому слову."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def index(self, post_id, text):
+        pass
+
+    def remove(self, post_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def queryset(self, query):
+        posts = Post.objects.using(self.connection.alias)
+        words = query.split()
+        if not words:
+            return posts.none()
+        for word in words:
+            posts = posts.filter(text__icontains=word)
+        return posts.order_by('-pub_date', '-id')
+
+    def count(self, query):
+        return self.queryset(query).count()
+
+    def ids(self, query, offset, limit):
+        return list(self.queryset(query).values_list(
+            'pk', flat=True
+        )[offset:offset + limit])
+
+
+BACKENDS = {
+    'sqlite': SqliteSearch,
+    'postgresql': PostgresSearch,
+}
+
+
+def get_backend(write=False):
+    """Поисковый бэкенд для базы, где лежат посты."""
+    if write:
+        alias = router.db_for_write(Post)
+    else:
+        alias = router.db_for_read(Post)
+    connection = connections[alias]
+    return BACKENDS.get(connection.vendor, ScanSearch)(connection)
+
+
+class SearchResults:
+    """Результаты поиска для Paginator.
+
+    Число совпадений и страница id берутся из индекса, посты
+    подгружаются одним запросом только для текущей страницы.
+    """
+
+    def __init__(self, query):
+        self.query = query
+        self.backend = get_backend()
+
+    def count(self):
+        return self.backend.count(self.query)
+
+    def __getitem__(self, page):
+        if not isinstance(page, slice):
+            raise TypeError('Результаты поиска можно только нарезать.')
+        offset = page.start or 0
+        ids = self.backend.ids(self.query, offset, page.stop - offset)
+        posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+def search_posts(query):
+    return SearchResults(query.strip())
@@ -0,0 +1,295 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.background import submit_on_commit
+
+from .cache import bump_after_commit, post_scopes
+from .counters import (
+    change_counter, change_user_followers, change_user_posts
+)
+from .models import Comment, Follow, Group, Post, User
+from .search import get_backend as get_search_backend
+from .storage import release_image, restore_image
+from .thumbnails import schedule_thumbnails
+from .timeline import (
+    is_pulled, remove_author, schedule_backfill, schedule_fan_out
+)
+from .uploads import EMPTY_METADATA, image_metadata
+
+logger = logging.getLogger(__name__)
+
+# Поля, которые видны в карточках постов и на странице профиля
+USER_NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_owners(sender, instance, raw, **kwargs):
+    """Запоминает прежних автора и группу, чтобы перенести счётчики."""
+    instance._saved_owners = None
+    if raw or instance.pk is None:
+        return
+    instance._saved_owners = Post.objects.filter(pk=instance.pk).values(
+        'author_id', 'group_id', 'author__username', 'group__slug', 'image'
+    ).first()
+
+
+@receiver(pre_save, sender=Post)
+def store_image_metadata(sender, instance, raw, **kwargs):
+    """Записывает размеры, вес, формат и хэш новой картинки поста."""
+    if raw:
+        return
+    image = instance.image
+    if not image:
+        metadata = EMPTY_METADATA
+    elif not image._committed:
+        # Загруженный файл ещё в памяти или во временном файле
+        metadata = image_metadata(image.file)
+    else:
+        old = instance._saved_owners
+        if old is not None and old['image'] == image.name:
+            return
+        try:
+            with image.open('rb'):
+                metadata = image_metadata(image)
+        except OSError:
+            logger.warning('Не удалось прочитать картинку %s', image.name)
+            metadata = EMPTY_METADATA
+    for field, value in metadata.items():
+        setattr(instance, field, value)
+
+
+@receiver(post_save, sender=Post)
+def invalidate_saved_post(sender, instance, raw, **kwargs):
+    scopes = post_scopes(
+        instance.pk,
+        instance.author.username,
+        instance.group.slug if instance.group_id else None
+    )
+    old = getattr(instance, '_saved_owners', None)
+    if old is not None:
+        scopes += post_scopes(
+            instance.pk, old['author__username'], old['group__slug']
+        )
+    bump_after_commit(*set(scopes))
+
+
+@receiver(post_save, sender=Post)
+def thumbnail_saved_image(sender, instance, created, raw, **kwargs):
+    if raw or not instance.image:
+        return
+    old = getattr(instance, '_saved_owners', None)
+    if created or old is None or old['image'] != instance.image.name:
+        schedule_thumbnails(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def restore_reused_image(sender, instance, created, raw, **kwargs):
+    if raw or not instance.image:
+        return
+    old = getattr(instance, '_saved_owners', None)
+    if created or old is None or old['image'] != instance.image.name:
+        # Файл мог уйти в корзину, пока пост с ним ещё не был виден
+        name = instance.image.name
+        transaction.on_commit(lambda: restore_image(name))
+
+
+@receiver(post_save, sender=Post)
+def release_replaced_image(sender, instance, raw, **kwargs):
+    old = getattr(instance, '_saved_owners', None)
+    if old is not None and old['image'] and (
+        old['image'] != instance.image.name
+    ):
+        submit_on_commit(release_image, old['image'])
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    if instance.image:
+        submit_on_commit(release_image, instance.image.name)
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post(sender, instance, **kwargs):
+    bump_after_commit(*post_scopes(
+        instance.pk,
+        instance.author.username,
+        instance.group.slug if instance.group_id else None
+    ))
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_slug(sender, instance, raw, **kwargs):
+    """Запоминает прежний slug: страницы кэшированы и под ним."""
+    instance._saved_slug = None
+    if raw or instance.pk is None:
+        return
+    instance._saved_slug = Group.objects.filter(pk=instance.pk).values_list(
+        'slug', flat=True
+    ).first()
+
+
+@receiver(post_save, sender=Group)
+def invalidate_saved_group(sender, instance, **kwargs):
+    """Сбрасывает страницы, где показаны название и адрес группы.
+
+    Это не только лента группы: карточки постов в общей ленте, в
+    профилях и на странице поста тоже ссылаются на группу.
+    """
+    slugs = {instance.slug}
+    old_slug = getattr(instance, '_saved_slug', None)
+    if old_slug:
+        slugs.add(old_slug)
+    scopes = {f'group:{slug}' for slug in slugs}
+    posts = Post.objects.filter(group=instance).order_by().values_list(
+        'pk', 'author__username'
+    )
+    for post_id, username in posts:
+        for slug in slugs:
+            scopes.update(post_scopes(post_id, username, slug))
+    bump_after_commit(*scopes)
+
+
+@receiver(pre_save, sender=User)
+def remember_user_names(sender, instance, raw, update_fields, **kwargs):
+    """Запоминает прежние имена, чтобы сбросить ленты при их смене."""
+    instance._saved_names = None
+    if raw or instance.pk is None:
+        return
+    # Вход в аккаунт сохраняет только last_login
+    if update_fields is not None and not set(update_fields) & set(
+        USER_NAME_FIELDS
+    ):
+        return
+    instance._saved_names = User.objects.filter(pk=instance.pk).values(
+        *USER_NAME_FIELDS
+    ).first()
+
+
+@receiver(post_save, sender=User)
+def invalidate_renamed_user(sender, instance, **kwargs):
+    """Сбрасывает страницы, где показано прежнее имя пользователя.
+
+    Фрагменты постов сбрасываются сами: имя входит в их ключ.
+    """
+    old = getattr(instance, '_saved_names', None)
+    if old is None or all(
+        old[field] == getattr(instance, field) for field in USER_NAME_FIELDS
+    ):
+        return
+    slugs = Post.objects.filter(
+        author=instance, group__isnull=False
+    ).order_by().values_list('group__slug', flat=True).distinct()
+    # Имена комментаторов видны на странице поста и в его комментариях
+    commented = (
+        Comment.objects.filter(author=instance)
+        .order_by()
+        .values_list('post_id', flat=True)
+        .distinct()
+    )
+    bump_after_commit(
+        'index',
+        f'profile:{instance.username}',
+        f'profile:{old["username"]}',
+        *(f'group:{slug}' for slug in slugs),
+        *(f'post:{post_id}' for post_id in commented)
+    )
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    if created:
+        change_user_posts(instance.author_id, 1)
+        change_counter(Group, instance.group_id, 'posts_count', 1)
+        return
+    old = getattr(instance, '_saved_owners', None)
+    if old is None:
+        return
+    if old['author_id'] != instance.author_id:
+        change_user_posts(old['author_id'], -1)
+        change_user_posts(instance.author_id, 1)
+    if old['group_id'] != instance.group_id:
+        change_counter(Group, old['group_id'], 'posts_count', -1)
+        change_counter(Group, instance.group_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    change_user_posts(instance.author_id, -1)
+    change_counter(Group, instance.group_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_post(sender, instance, **kwargs):
+    if instance.post_id is None:
+        return
+    # Число комментариев есть и в лентах, не только на странице поста
+    if Comment.post.is_cached(instance):
+        post = instance.post
+        bump_after_commit(*post_scopes(
+            post.pk,
+            post.author.username,
+            post.group.slug if post.group_id else None
+        ))
+        return
+    owners = Post.objects.filter(pk=instance.post_id).values(
+        'author__username', 'group__slug'
+    ).first()
+    if owners is None:
+        bump_after_commit(f'post:{instance.post_id}')
+        return
+    bump_after_commit(*post_scopes(
+        instance.post_id, owners['author__username'], owners['group__slug']
+    ))
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        change_counter(Post, instance.post_id, 'comments_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    change_counter(Post, instance.post_id, 'comments_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, **kwargs):
+    get_search_backend(write=True).index(instance.pk, instance.text)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    get_search_backend(write=True).remove(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_saved_post(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        schedule_fan_out(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw, **kwargs):
+    if not created or raw:
+        return
+    change_user_followers(instance.author_id, 1)
+    bump_after_commit(f'profile:{instance.author.username}')
+    schedule_backfill(instance.author_id, [instance.user_id])
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    was_pulled = is_pulled(instance.author_id)
+    change_user_followers(instance.author_id, -1)
+    bump_after_commit(f'profile:{instance.author.username}')
+    remove_author(instance.user_id, instance.author_id)
+    if was_pulled and not is_pulled(instance.author_id):
+        # Пока автор был «тянущимся», его посты никто не раскладывал
+        schedule_backfill(instance.author_id)
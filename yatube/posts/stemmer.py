@@ -0,0 +1,104 @@
+"""Стеммер Портера (Snowball) для русского языка.
+
+Нужен поиску на SQLite: FTS5 умеет стемминг только для английского,
+поэтому в индекс и в запрос попадают уже обрезанные основы слов.
+Алгоритм: https://snowballstem.org/algorithms/russian/stemmer.html
+"""
+import re
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = re.compile(
+    r'(?:ившись|ывшись|ивши|ывши|ив|ыв|(?<=[ая])(?:вшись|вши|в))$'
+)
+REFLEXIVE = re.compile(r'(?:ся|сь)$')
+ADJECTIVE = re.compile(
+    r'(?:ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|'
+    r'их|ых|ую|юю|ая|яя|ою|ею)$'
+)
+PARTICIPLE = re.compile(r'(?:ивш|ывш|ующ|(?<=[ая])(?:ем|нн|вш|ющ|щ))$')
+VERB = re.compile(
+    r'(?:ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|'
+    r'ыло|ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю|'
+    r'(?<=[ая])(?:ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно))$'
+)
+NOUN = re.compile(
+    r'(?:а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|'
+    r'ем|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+DERIVATIONAL = re.compile(r'ость?$')
+SUPERLATIVE = re.compile(r'ейше?$')
+
+WORD = re.compile(r'\w+')
+CYRILLIC = re.compile(r'[а-я]')
+
+
+def _after_vowel_pair(word, start):
+    """Начало области после первой пары «гласная, согласная» от start."""
+    for index in range(start + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            return index + 1
+    return len(word)
+
+
+def _cut(pattern, word):
+    """Отрезает найденное окончание; None, если его нет."""
+    match = pattern.search(word)
+    if match is None:
+        return None
+    return word[:match.start()]
+
+
+def _step1(rv):
+    cut = _cut(PERFECTIVE_GERUND, rv)
+    if cut is not None:
+        return cut
+    cut = _cut(REFLEXIVE, rv)
+    if cut is not None:
+        rv = cut
+    cut = _cut(ADJECTIVE, rv)
+    if cut is not None:
+        participle = _cut(PARTICIPLE, cut)
+        return cut if participle is None else participle
+    for pattern in (VERB, NOUN):
+        cut = _cut(pattern, rv)
+        if cut is not None:
+            return cut
+    return rv
+
+
+def stem(word):
+    """Основа слова; слова без кириллицы только приводятся к нижнему
+    регистру."""
+    word = word.lower().replace('ё', 'е')
+    if not CYRILLIC.search(word):
+        return word
+    rv_start = next(
+        (index + 1 for index, letter in enumerate(word) if letter in VOWELS),
+        None
+    )
+    if rv_start is None:
+        return word
+    r2_start = _after_vowel_pair(word, _after_vowel_pair(word, 0))
+    rv = _step1(word[rv_start:])
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    match = DERIVATIONAL.search(rv)
+    if match and rv_start + match.start() >= r2_start:
+        rv = rv[:match.start()]
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    else:
+        match = SUPERLATIVE.search(rv)
+        if match:
+            rv = rv[:match.start()]
+            if rv.endswith('нн'):
+                rv = rv[:-1]
+        elif rv.endswith('ь'):
+            rv = rv[:-1]
+    return word[:rv_start] + rv
+
+
+def stems(text):
+    """Основы всех слов текста по порядку."""
+    return [stem(word) for word in WORD.findall(text)]
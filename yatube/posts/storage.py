@@ -0,0 +1,145 @@
+"""Хранилище картинок постов, адресуемое содержимым.
+
+Имя файла — SHA-256 его байтов, поэтому повторная загрузка той же
+картинки не создаёт новый файл, а у sorl, который именует миниатюры
+по имени исходника, не появляется новых миниатюр. Счётчик ссылок —
+сами посты: файл без ссылок уходит в корзину и удаляется после
+срока POSTS_IMAGE_TRASH_GRACE.
+"""
+import os
+import posixpath
+import time
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from sorl.thumbnail import delete as delete_with_thumbnails
+from sorl.thumbnail.images import ImageFile
+
+from core.background import submit_later
+
+from .uploads import file_hash
+
+# Как у миниатюр sorl: два уровня каталогов по два символа хэша,
+# чтобы в одном каталоге не копились сотни тысяч файлов
+SHARD_LEVELS = 2
+SHARD_WIDTH = 2
+HEX_DIGITS = set('0123456789abcdef')
+# Освобождённые файлы сначала попадают сюда, см. release_image
+TRASH_DIR = 'trash'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def content_name(self, name, digest):
+        """Имя файла с содержимым `digest`.
+
+        Каталог и расширение берутся из загружаемого имени name,
+        подкаталоги — из начала хэша: posts/ab/cd/abcd….jpg.
+        """
+        directory = posixpath.dirname(name)
+        extension = posixpath.splitext(name)[1].lower()
+        shards = [
+            digest[level * SHARD_WIDTH:(level + 1) * SHARD_WIDTH]
+            for level in range(SHARD_LEVELS)
+        ]
+        return posixpath.join(directory, *shards, f'{digest}{extension}')
+
+    def name_digest(self, name):
+        """Хэш из имени файла по содержимому; None для прочих имён."""
+        stem = posixpath.splitext(posixpath.basename(name))[0]
+        if len(stem) == 64 and set(stem) <= HEX_DIGITS:
+            return stem
+        return None
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(name, file_hash(content))
+        if self.exists(name):
+            # Такой файл уже загружен, второй экземпляр не нужен
+            return name
+        return super().save(name, content, max_length)
+
+
+post_images = ContentAddressedStorage()
+
+
+def image_references(name):
+    """Число постов, ссылающихся на файл картинки."""
+    from .models import Post
+
+    return Post.objects.filter(image=name).count()
+
+
+def trash_name(name):
+    return posixpath.join(TRASH_DIR, name)
+
+
+def _move(source, target):
+    target_path = post_images.path(target)
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    try:
+        os.replace(post_images.path(source), target_path)
+    except FileNotFoundError:
+        return False
+    # Срок в корзине отсчитывается от переноса, а не от загрузки
+    os.utime(target_path)
+    return True
+
+
+def release_image(name):
+    """Убирает файл в корзину, если на него больше не ссылаются.
+
+    Новый пост с той же картинкой не пишет файл, если тот уже лежит
+    на месте, и мог зафиксироваться между подсчётом ссылок и переносом.
+    Поэтому после переноса ссылки считаются ещё раз, а сам файл и
+    миниатюры удаляются только через POSTS_IMAGE_TRASH_GRACE.
+    Возвращает True, если файл убран в корзину.
+    """
+    if not name or image_references(name):
+        return False
+    if not _move(name, trash_name(name)):
+        return False
+    if image_references(name):
+        restore_image(name)
+        return False
+    submit_later(settings.POSTS_IMAGE_TRASH_GRACE, purge_image, name)
+    return True
+
+
+def restore_image(name):
+    """Возвращает файл из корзины, если на месте его нет."""
+    if post_images.exists(name):
+        return False
+    return _move(trash_name(name), name)
+
+
+def purge_image(name):
+    """Удаляет файл из корзины, а миниатюры — если ссылок так и нет."""
+    if image_references(name):
+        restore_image(name)
+    else:
+        delete_with_thumbnails(ImageFile(name, post_images))
+    post_images.delete(trash_name(name))
+
+
+def purge_trash(grace):
+    """Удаляет из корзины файлы, пролежавшие дольше grace секунд.
+
+    Возвращает их число. Нужна, если процесс завершился раньше,
+    чем сработало отложенное удаление.
+    """
+    root = post_images.path(TRASH_DIR)
+    deadline = time.time() - grace
+    purged = 0
+    for directory, _, files in os.walk(root):
+        for file_name in files:
+            path = os.path.join(directory, file_name)
+            if os.path.getmtime(path) > deadline:
+                continue
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            purge_image(name)
+            purged += 1
+    return purged
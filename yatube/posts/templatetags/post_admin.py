@@ -0,0 +1,125 @@
+import calendar
+import datetime
+
+from django import template
+from django.utils import formats, timezone
+from django.utils.text import capfirst
+from django.utils.translation import gettext as _
+
+register = template.Library()
+
+
+def _edge(queryset, field_name, descending=False):
+    """Самая ранняя или поздняя дата выборки — один проход по индексу."""
+    order = f'-{field_name}' if descending else field_name
+    value = queryset.order_by(order).values_list(
+        field_name, flat=True
+    ).first()
+    if isinstance(value, datetime.datetime) and timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value
+
+
+def _months(year, first, last):
+    start = first.month if first.year == year else 1
+    end = last.month if last.year == year else 12
+    return [datetime.date(year, month, 1) for month in range(start, end + 1)]
+
+
+def _days(year, month, first, last):
+    start = 1
+    end = calendar.monthrange(year, month)[1]
+    if (first.year, first.month) == (year, month):
+        start = first.day
+    if (last.year, last.month) == (year, month):
+        end = last.day
+    return [datetime.date(year, month, day) for day in range(start, end + 1)]
+
+
+@register.inclusion_tag('admin/date_hierarchy.html')
+def post_date_hierarchy(cl):
+    """Навигация по датам, как у date_hierarchy, но без DISTINCT по таблице.
+
+    Стандартный тег перечисляет годы, месяцы и дни запросом dates(),
+    который обходит всю выборку. Здесь берутся только первая и последняя
+    даты по индексу, а между ними перечисляются все периоды подряд,
+    в том числе пустые.
+    """
+    field_name = cl.date_hierarchy
+    year_field = f'{field_name}__year'
+    month_field = f'{field_name}__month'
+    day_field = f'{field_name}__day'
+    year_lookup = cl.params.get(year_field)
+    month_lookup = cl.params.get(month_field)
+    day_lookup = cl.params.get(day_field)
+
+    def link(filters):
+        return cl.get_query_string(filters, [f'{field_name}__'])
+
+    first = _edge(cl.queryset, field_name)
+    last = _edge(cl.queryset, field_name, descending=True)
+    if first is None:
+        return {'show': False}
+    if not (year_lookup or month_lookup or day_lookup):
+        if first.year == last.year:
+            year_lookup = first.year
+            if first.month == last.month:
+                month_lookup = first.month
+
+    if year_lookup and month_lookup and day_lookup:
+        day = datetime.date(
+            int(year_lookup), int(month_lookup), int(day_lookup)
+        )
+        return {
+            'show': True,
+            'back': {
+                'link': link({
+                    year_field: year_lookup, month_field: month_lookup
+                }),
+                'title': capfirst(formats.date_format(
+                    day, 'YEAR_MONTH_FORMAT'
+                )),
+            },
+            'choices': [{
+                'title': capfirst(formats.date_format(day, 'MONTH_DAY_FORMAT'))
+            }],
+        }
+    if year_lookup and month_lookup:
+        days = _days(int(year_lookup), int(month_lookup), first, last)
+        return {
+            'show': True,
+            'back': {
+                'link': link({year_field: year_lookup}),
+                'title': str(year_lookup),
+            },
+            'choices': [{
+                'link': link({
+                    year_field: year_lookup,
+                    month_field: month_lookup,
+                    day_field: day.day,
+                }),
+                'title': capfirst(formats.date_format(day, 'MONTH_DAY_FORMAT'))
+            } for day in days],
+        }
+    if year_lookup:
+        months = _months(int(year_lookup), first, last)
+        return {
+            'show': True,
+            'back': {'link': link({}), 'title': _('All dates')},
+            'choices': [{
+                'link': link({
+                    year_field: year_lookup, month_field: month.month
+                }),
+                'title': capfirst(formats.date_format(
+                    month, 'YEAR_MONTH_FORMAT'
+                )),
+            } for month in months],
+        }
+    return {
+        'show': True,
+        'back': None,
+        'choices': [{
+            'link': link({year_field: str(year)}),
+            'title': str(year),
+        } for year in range(first.year, last.year + 1)],
+    }
@@ -0,0 +1,49 @@
+from django import template
+
+from ..thumbnails import (
+    get_ready_thumbnail, get_ready_variants, schedule_thumbnails
+)
+
+register = template.Library()
+
+
+@register.simple_tag
+def ready_thumbnail(image, size):
+    """Готовая миниатюра или None; недостающая ставится в очередь.
+
+    Запрос никогда не ждёт Pillow: пока миниатюры нет,
+    шаблон показывает заглушку.
+    """
+    thumbnail = get_ready_thumbnail(image, size)
+    if image and thumbnail is None:
+        schedule_thumbnails(image.instance.pk)
+    return thumbnail
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def picture(image, size, css_class='card-img my-2'):
+    """Картинка поста со srcset по всем готовым вариантам.
+
+    Современные форматы отдаются через <source>, JPEG — запасной
+    вариант в самом <img>. Пока основной миниатюры нет — заглушка.
+    """
+    thumbnail = ready_thumbnail(image, size)
+    variants = get_ready_variants(image, size)
+    fallback = variants.pop('JPEG', [])
+    return {
+        'image': image,
+        'thumbnail': thumbnail,
+        'css_class': css_class,
+        'srcset': srcset(fallback),
+        'sources': [
+            {'type': f'image/{image_format.lower()}',
+             'srcset': srcset(thumbnails)}
+            for image_format, thumbnails in variants.items()
+        ],
+    }
+
+
+def srcset(thumbnails):
+    return ', '.join(
+        f'{thumbnail.url} {width}w' for width, thumbnail in thumbnails
+    )
@@ -0,0 +1,11 @@
+from django import template
+
+from ..pagination import elided_page_range
+
+register = template.Library()
+
+
+@register.filter
+def page_window(page_obj):
+    """Номера страниц для навигации; None — место для многоточия."""
+    return list(elided_page_range(page_obj.paginator, page_obj.number))
@@ -0,0 +1,98 @@
+import datetime
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Group, Post, User
+from ..pagination import EstimatedCountPaginator
+
+
+class PostAdminTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_posts(self, count, year=2022):
+        posts = [
+            Post.objects.create(
+                text=f'Пост {number}', author=self.admin, group=self.group
+            )
+            for number in range(count)
+        ]
+        Post.objects.filter(pk__in=[post.pk for post in posts]).update(
+            pub_date=timezone.make_aware(datetime.datetime(year, 3, 5))
+        )
+
+    def changelist_queries(self, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('admin:posts_post_changelist'), params or {}
+            )
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Число запросов списка постов не зависит от числа строк."""
+        self.add_posts(2)
+        few = self.changelist_queries()
+        self.add_posts(10)
+        self.assertEqual(self.changelist_queries(), few)
+
+    def test_group_is_edited_with_lookup_widget(self):
+        """Группа в списке правится полем id, а не списком всех групп."""
+        self.add_posts(1)
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertContains(response, 'vForeignKeyRawIdAdminField')
+        self.assertNotContains(response, '<option value="">')
+
+    def test_date_hierarchy_lists_range_between_edges(self):
+        """Навигация по датам перечисляет годы и месяцы между краями."""
+        self.add_posts(1, year=2020)
+        self.add_posts(1, year=2022)
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        for year in (2020, 2021, 2022):
+            with self.subTest(year=year):
+                self.assertContains(response, f'?pub_date__year={year}')
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'),
+            {'pub_date__year': 2022}
+        )
+        self.assertContains(response, 'pub_date__month=3')
+        self.assertNotContains(response, 'pub_date__month=4')
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='auth')
+        posts = [
+            Post.objects.create(text='Текст', author=user) for _ in range(3)
+        ]
+        posts[0].delete()
+
+    @mock.patch('posts.pagination.ESTIMATE_THRESHOLD', 1)
+    def test_unfiltered_count_is_estimated(self):
+        """Без фильтров число строк берётся по наибольшему ключу."""
+        paginator = EstimatedCountPaginator(Post.objects.all(), 10)
+        latest_pk = Post.objects.latest('pk').pk
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, latest_pk)
+
+    @mock.patch('posts.pagination.ESTIMATE_THRESHOLD', 1)
+    def test_filtered_count_is_exact(self):
+        """Отфильтрованная выборка считается точно."""
+        paginator = EstimatedCountPaginator(
+            Post.objects.filter(text='Текст'), 10
+        )
+        self.assertEqual(paginator.count, 2)
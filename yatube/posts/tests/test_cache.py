@@ -0,0 +1,281 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..cache import fragment_stats, get_version
+from ..models import Post, Group, User, Comment
+
+
+class FeedCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title="Заголовок",
+            slug="the_group",
+            description="Описание"
+        )
+        cls.other_group = Group.objects.create(
+            title="Другая группа",
+            slug="other_group",
+            description="Описание"
+        )
+        cls.feeds = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'the_group'}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.post = Post.objects.create(
+            text='Старый текст', author=self.user, group=self.group
+        )
+
+    def test_feeds_are_cached(self):
+        """Ленты отдаются из кэша, пока посты не менялись через модель."""
+        for address in self.feeds:
+            with self.subTest(address=address):
+                response = self.guest_client.get(address)
+                Post.objects.filter(pk=self.post.pk).update(text='Тихо')
+                cached = self.guest_client.get(address)
+                self.assertEqual(response.content, cached.content)
+                Post.objects.filter(pk=self.post.pk).update(
+                    text='Старый текст'
+                )
+
+    def test_new_post_is_visible_immediately(self):
+        """Новый пост сразу виден во всех своих лентах."""
+        for address in self.feeds:
+            self.guest_client.get(address)
+        Post.objects.create(
+            text='Свежий пост', author=self.user, group=self.group
+        )
+        for address in self.feeds:
+            with self.subTest(address=address):
+                response = self.guest_client.get(address)
+                self.assertContains(response, 'Свежий пост')
+
+    def test_edit_and_delete_are_visible_immediately(self):
+        """Правка и удаление поста сбрасывают кэш лент."""
+        for address in self.feeds:
+            self.guest_client.get(address)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        for address in self.feeds:
+            with self.subTest(address=address):
+                self.assertContains(
+                    self.guest_client.get(address), 'Новый текст'
+                )
+        self.post.delete()
+        for address in self.feeds:
+            with self.subTest(address=address):
+                self.assertNotContains(
+                    self.guest_client.get(address), 'Новый текст'
+                )
+
+    def test_moved_post_leaves_old_group_feed(self):
+        """Перенос поста сбрасывает кэш и старой, и новой группы."""
+        old_group = reverse('posts:group_list', kwargs={'slug': 'the_group'})
+        new_group = reverse(
+            'posts:group_list', kwargs={'slug': 'other_group'}
+        )
+        self.guest_client.get(old_group)
+        self.guest_client.get(new_group)
+        self.post.group = self.other_group
+        self.post.save()
+        self.assertNotContains(self.guest_client.get(old_group), 'Старый')
+        self.assertContains(self.guest_client.get(new_group), 'Старый')
+
+    def test_renamed_group_drops_old_slug_pages(self):
+        """Смена slug сбрасывает кэш и под старым, и под новым адресом."""
+        old_version = get_version('group:the_group')
+        new_version = get_version('group:renamed')
+        self.group.slug = 'renamed'
+        self.group.save()
+        self.assertGreater(get_version('group:the_group'), old_version)
+        self.assertGreater(get_version('group:renamed'), new_version)
+        self.group.slug = 'the_group'
+        self.group.save()
+
+    def test_other_feeds_keep_their_version(self):
+        """Запись в одну группу не трогает версию другой."""
+        version = get_version('group:other_group')
+        Post.objects.create(text='Текст', author=self.user, group=self.group)
+        self.assertEqual(get_version('group:other_group'), version)
+
+    def test_comment_bumps_post_version(self):
+        """Комментарий сдвигает версию своего поста."""
+        version = get_version(f'post:{self.post.pk}')
+        Comment.objects.create(text='Текст', author=self.user, post=self.post)
+        self.assertGreater(get_version(f'post:{self.post.pk}'), version)
+
+
+class PostFragmentCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title="Заголовок",
+            slug="the_group",
+            description="Описание"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Текст поста', author=self.user, group=self.group
+        )
+
+    def test_fragment_is_shared_between_feeds(self):
+        """Разметка поста отрисовывается один раз на все ленты."""
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(fragment_stats(), {'hits': 0, 'misses': 1})
+        self.client.get(
+            reverse('posts:group_list', kwargs={'slug': 'the_group'})
+        )
+        self.client.get(reverse('posts:profile', kwargs={'username': 'auth'}))
+        self.assertEqual(fragment_stats(), {'hits': 2, 'misses': 1})
+
+    def test_edited_post_fragment_is_rendered_again(self):
+        """После правки пост отрисовывается заново."""
+        self.client.get(reverse('posts:index'))
+        self.post.text = 'Исправленный текст'
+        self.post.save()
+        response = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': 'the_group'})
+        )
+        self.assertContains(response, 'Исправленный текст')
+        self.assertEqual(fragment_stats(), {'hits': 0, 'misses': 2})
+
+    def test_renamed_author_is_shown_everywhere(self):
+        """Новое имя автора сразу видно в лентах и карточках."""
+        feeds = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'the_group'}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+        ]
+        for address in feeds:
+            self.client.get(address)
+        self.user.first_name = 'Лев'
+        self.user.last_name = 'Толстой'
+        self.user.save()
+        for address in feeds:
+            with self.subTest(address=address):
+                self.assertContains(self.client.get(address), 'Лев Толстой')
+
+    def test_login_keeps_feed_versions(self):
+        """Вход в аккаунт не сбрасывает ленты автора."""
+        version = get_version('profile:auth')
+        self.client.force_login(self.user)
+        self.assertEqual(get_version('profile:auth'), version)
+
+
+class ConditionalPagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title="Заголовок",
+            slug="the_group",
+            description="Описание"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Текст', author=self.user, group=self.group
+        )
+        self.pages = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'the_group'}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+
+    def test_unchanged_page_answers_304(self):
+        """Неизменившаяся страница отдаёт 304 без запросов к базе.
+
+        Странице поста нужен один запрос — узнать автора, число
+        постов которого на ней показано.
+        """
+        queries = dict.fromkeys(self.pages, 0)
+        queries[self.pages[-1]] = 1
+        for address in self.pages:
+            with self.subTest(address=address):
+                etag = self.client.get(address)['ETag']
+                with self.assertNumQueries(queries[address]):
+                    response = self.client.get(
+                        address, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+
+    def test_edit_changes_etag(self):
+        """После правки поста страницы отдаются заново."""
+        etags = {
+            address: self.client.get(address)['ETag']
+            for address in self.pages
+        }
+        self.post.text = 'Новый текст'
+        self.post.save()
+        for address, etag in etags.items():
+            with self.subTest(address=address):
+                response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_new_post_of_author_changes_post_etag(self):
+        """Новый пост автора меняет ETag его старых постов."""
+        address = self.pages[-1]
+        etag = self.client.get(address)['ETag']
+        Post.objects.create(text='Ещё пост', author=self.user)
+        response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '<span> 2 </span>')
+
+    def test_renamed_group_link_changes_everywhere(self):
+        """Новый адрес группы сразу виден в лентах и на странице поста."""
+        pages = [self.pages[0], self.pages[2], self.pages[3]]
+        etags = {
+            address: self.client.get(address)['ETag'] for address in pages
+        }
+        self.group.slug = 'renamed'
+        self.group.save()
+        new_link = reverse('posts:group_list', kwargs={'slug': 'renamed'})
+        for address, etag in etags.items():
+            with self.subTest(address=address):
+                response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, new_link)
+        self.group.slug = 'the_group'
+        self.group.save()
+
+    def test_renamed_commenter_changes_post_etag(self):
+        """Смена имени комментатора меняет ETag страницы поста."""
+        reader = User.objects.create_user(username='reader')
+        Comment.objects.create(text='Текст', author=reader, post=self.post)
+        address = self.pages[-1]
+        etag = self.client.get(address)['ETag']
+        reader.username = 'renamed_reader'
+        reader.save()
+        response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'renamed_reader')
+
+    def test_etag_depends_on_page_and_user(self):
+        """ETag различается по номеру страницы и пользователю."""
+        address = self.pages[0]
+        anonymous = self.client.get(address)
+        self.assertEqual(anonymous['Cache-Control'], 'public, no-cache')
+        self.assertIn('Cookie', anonymous['Vary'])
+        self.assertFalse(anonymous.has_header('Expires'))
+        self.assertNotEqual(
+            anonymous['ETag'], self.client.get(address, {'page': 2})['ETag']
+        )
+        self.client.force_login(self.user)
+        logged_in = self.client.get(address)
+        self.assertEqual(logged_in['Cache-Control'], 'private, no-cache')
+        self.assertNotEqual(logged_in['ETag'], anonymous['ETag'])
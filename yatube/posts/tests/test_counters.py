@@ -0,0 +1,83 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Post, Group, User, Comment, UserStats
+
+
+class PostsCountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title="Заголовок",
+            slug="the_group",
+            description="Описание"
+        )
+        cls.other_group = Group.objects.create(
+            title="Другая группа",
+            slug="other_group",
+            description="Описание"
+        )
+
+    def assertCounters(self, user_posts, group_posts, other_group_posts):
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(
+            UserStats.objects.get(user=self.user).posts_count, user_posts
+        )
+        self.assertEqual(self.group.posts_count, group_posts)
+        self.assertEqual(self.other_group.posts_count, other_group_posts)
+
+    def test_post_create_and_delete_change_counters(self):
+        """Создание и удаление поста меняют счётчики автора и группы."""
+        post = Post.objects.create(
+            text='Текст', author=self.user, group=self.group
+        )
+        Post.objects.create(text='Текст', author=self.user)
+        self.assertCounters(2, 1, 0)
+        post.delete()
+        self.assertCounters(1, 0, 0)
+
+    def test_post_move_between_groups(self):
+        """Перенос поста в другую группу переносит счётчик."""
+        post = Post.objects.create(
+            text='Текст', author=self.user, group=self.group
+        )
+        post.group = self.other_group
+        post.save()
+        self.assertCounters(1, 0, 1)
+        post.group = None
+        post.save()
+        self.assertCounters(1, 0, 0)
+
+    def test_comment_create_and_delete_change_counter(self):
+        """Комментарии учитываются в счётчике поста."""
+        post = Post.objects.create(text='Текст', author=self.user)
+        comment = Comment.objects.create(
+            text='Текст', author=self.user, post=post
+        )
+        Comment.objects.create(text='Текст', author=self.user, post=post)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 2)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+    def test_rebuild_counters_fixes_drift(self):
+        """Команда rebuild_counters находит и исправляет расхождения."""
+        Post.objects.bulk_create([
+            Post(text='Текст', author=self.user, group=self.group),
+            Post(text='Текст', author=self.user, group=self.group),
+        ])
+        out = StringIO()
+        call_command('rebuild_counters', '--dry-run', stdout=out)
+        self.assertIn('Найдено расхождений: 2', out.getvalue())
+        self.assertFalse(UserStats.objects.filter(user=self.user).exists())
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertCounters(2, 2, 0)
+        out = StringIO()
+        call_command('rebuild_counters', stdout=out)
+        self.assertIn('Расхождений нет', out.getvalue())
@@ -0,0 +1,162 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry, User, UserStats
+from ..timeline import (
+    backfill, fan_out_post, follow_feed, rebuild_timeline, trim_timelines
+)
+
+
+class FollowViewsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def followers_count(self):
+        return UserStats.objects.get(user=self.author).followers_count
+
+    def test_follow_and_unfollow(self):
+        """Подписка и отписка меняют Follow и счётчик подписчиков."""
+        self.client.post(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        self.assertTrue(
+            Follow.objects.filter(user=self.reader, author=self.author)
+            .exists()
+        )
+        self.assertEqual(self.followers_count(), 1)
+        # Повторная подписка ничего не меняет
+        self.client.post(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        self.assertEqual(self.followers_count(), 1)
+        self.client.post(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(self.followers_count(), 0)
+
+    def test_cannot_follow_self(self):
+        """На себя подписаться нельзя."""
+        self.client.post(
+            reverse('posts:profile_follow', args=[self.reader.username])
+        )
+        self.assertFalse(Follow.objects.exists())
+
+    def test_follow_requires_post(self):
+        """Подписка по GET не выполняется."""
+        response = self.client.get(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        self.assertEqual(response.status_code, 405)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_profile_shows_follow_state(self):
+        """Кнопка в профиле зависит от того, подписан ли читатель."""
+        address = reverse('posts:profile', args=[self.author.username])
+        self.assertFalse(self.client.get(address).context['following'])
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertTrue(self.client.get(address).context['following'])
+
+    def test_follow_index_shows_followed_authors(self):
+        """В ленте подписок только посты авторов из подписок."""
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Подписка', author=self.author)
+        Post.objects.create(text='Чужой', author=other)
+        fan_out_post(post.pk)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), [post])
+
+
+class TimelineTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.readers = [
+            User.objects.create_user(username=f'reader{number}')
+            for number in range(3)
+        ]
+        for reader in self.readers:
+            Follow.objects.create(user=reader, author=self.author)
+
+    def test_fan_out_post(self):
+        """Пост раскладывается в ленты всех подписчиков."""
+        post = Post.objects.create(text='Текст', author=self.author)
+        with self.settings(POSTS_FANOUT_BATCH=2):
+            self.assertEqual(fan_out_post(post.pk), 3)
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(post=post)
+                .values_list('user_id', flat=True)),
+            {reader.pk for reader in self.readers}
+        )
+        # Повторная раскладка не создаёт дублей
+        fan_out_post(post.pk)
+        self.assertEqual(TimelineEntry.objects.count(), 3)
+
+    def test_unfollow_removes_entries(self):
+        """После отписки посты автора пропадают из ленты."""
+        post = Post.objects.create(text='Текст', author=self.author)
+        fan_out_post(post.pk)
+        Follow.objects.filter(user=self.readers[0]).delete()
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.readers[0]).exists()
+        )
+
+    def test_backfill_after_follow(self):
+        """Новый подписчик получает недавние посты автора."""
+        post = Post.objects.create(text='Текст', author=self.author)
+        reader = User.objects.create_user(username='late')
+        Follow.objects.create(user=reader, author=self.author)
+        backfill(self.author.pk, [reader.pk])
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=reader, post=post).exists()
+        )
+
+    @override_settings(POSTS_FANOUT_MAX_FOLLOWERS=3)
+    def test_popular_author_is_pulled(self):
+        """Посты автора с множеством подписчиков читаются без раскладки."""
+        post = Post.objects.create(text='Текст', author=self.author)
+        self.assertEqual(fan_out_post(post.pk), 0)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(list(follow_feed(self.readers[0])), [post])
+
+    def test_rebuild_timeline(self):
+        """Лента собирается заново по подпискам."""
+        post = Post.objects.create(text='Текст', author=self.author)
+        rebuild_timeline(self.readers[0].pk)
+        self.assertEqual(
+            list(TimelineEntry.objects.values_list('user_id', 'post_id')),
+            [(self.readers[0].pk, post.pk)]
+        )
+
+    @override_settings(POSTS_TIMELINE_LENGTH=2)
+    def test_timeline_is_capped(self):
+        """В ленте остаются только POSTS_TIMELINE_LENGTH свежих постов."""
+        posts = [
+            Post.objects.create(text=f'Пост {number}', author=self.author)
+            for number in range(4)
+        ]
+        for post in posts:
+            fan_out_post(post.pk)
+        for reader in self.readers:
+            with self.subTest(reader=reader.username):
+                self.assertEqual(
+                    set(TimelineEntry.objects.filter(user=reader)
+                        .values_list('post_id', flat=True)),
+                    {posts[2].pk, posts[3].pk}
+                )
+        reader = User.objects.create_user(username='late')
+        Follow.objects.create(user=reader, author=self.author)
+        backfill(self.author.pk, [reader.pk])
+        self.assertEqual(TimelineEntry.objects.filter(user=reader).count(), 2)
+
+    def test_short_timeline_is_not_trimmed(self):
+        """Лента короче предела не обрезается."""
+        post = Post.objects.create(text='Текст', author=self.author)
+        fan_out_post(post.pk)
+        trim_timelines([reader.pk for reader in self.readers])
+        self.assertEqual(TimelineEntry.objects.count(), 3)
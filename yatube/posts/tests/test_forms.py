@@ -2,11 +2,13 @@ import shutil
 import tempfile
 
 from http import HTTPStatus
+from io import BytesIO
 
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
 
 from ..models import Post, Group, User, Comment
 from .. forms import CommentForm
@@ -167,3 +169,83 @@ class PostsFormTest(TestCase):
             follow=True
         )
         self.assertEqual(Post.objects.count(), posts_count+1)
+
+
+def make_photo(size, orientation=None):
+    """JPEG с EXIF, как его присылает телефон."""
+    buffer = BytesIO()
+    exif = Image.Exif()
+    exif[0x010F] = 'Камера'
+    if orientation:
+        exif[0x0112] = orientation
+    Image.effect_noise(size, 64).convert('RGB').save(
+        buffer, 'JPEG', exif=exif.tobytes(), quality=95
+    )
+    return SimpleUploadedFile('photo.jpg', buffer.getvalue(), 'image/jpeg')
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    BACKGROUND_WORKERS=0,
+    POSTS_IMAGE_MAX_DIMENSIONS=(400, 400),
+)
+class PostImageUploadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def create(self, image):
+        return self.client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Текст', 'image': image},
+        )
+
+    def test_large_photo_is_downscaled_and_stripped(self):
+        """Фото поворачивается по EXIF, уменьшается и теряет метаданные."""
+        # Ориентация 6: снимок надо повернуть на 90 градусов
+        self.create(make_photo((900, 600), orientation=6))
+        post = Post.objects.get()
+        with Image.open(post.image) as image:
+            self.assertEqual(image.size, (267, 400))
+            self.assertFalse(image.getexif())
+
+    @override_settings(POSTS_IMAGE_MAX_BYTES=20 * 1024)
+    def test_photo_is_recompressed_to_max_bytes(self):
+        """Тяжёлое фото пережимается до POSTS_IMAGE_MAX_BYTES."""
+        self.create(make_photo((400, 400)))
+        self.assertLessEqual(Post.objects.get().image.size, 20 * 1024)
+
+    @override_settings(POSTS_IMAGE_UPLOAD_MAX_SIZE=10 * 1024)
+    def test_oversized_upload_is_rejected(self):
+        """Слишком большой файл отбрасывается с ошибкой в форме."""
+        response = self.create(make_photo((400, 400)))
+        self.assertFalse(Post.objects.exists())
+        self.assertIn('слишком большой', response.context['form'].errors[
+            'image'
+        ][0])
+
+    def test_create_still_checks_csrf(self):
+        """Ограничение загрузки не отключает проверку CSRF."""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = client.post(
+            reverse('posts:post_create'), data={'text': 'Текст'}
+        )
+        self.assertTemplateUsed(response, 'core/403csrf.html')
+        self.assertFalse(Post.objects.exists())
+
+    def test_limit_applies_only_to_post_forms(self):
+        """Обработчик с лимитом не подключён ко всему сайту."""
+        self.assertNotIn(
+            'posts.uploads.LimitedUploadHandler',
+            settings.FILE_UPLOAD_HANDLERS
+        )
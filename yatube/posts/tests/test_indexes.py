@@ -0,0 +1,21 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+
+class FeedIndexesBenchTest(TestCase):
+    def test_feeds_use_composite_indexes(self):
+        """После составных индексов ленты не сортируют во временном дереве."""
+        out = StringIO()
+        call_command(
+            'bench_feed_indexes', '--posts', '500', '--comments', '100',
+            '--authors', '5', '--groups', '3', '--repeat', '1', stdout=out
+        )
+        before, after = out.getvalue().split('После:')
+        self.assertIn('USE TEMP B-TREE FOR ORDER BY', before)
+        self.assertNotIn('USE TEMP B-TREE', after)
+        for index in ('post_group_pub_date_idx', 'post_author_pub_date_idx',
+                      'comment_post_created_idx'):
+            with self.subTest(index=index):
+                self.assertIn(index, after)
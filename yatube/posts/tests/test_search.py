@@ -0,0 +1,88 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Post, User
+from ..stemmer import stem
+from ..views import QT_POST_PG
+
+
+class StemmerTest(TestCase):
+    def test_word_forms_share_stem(self):
+        """Формы одного слова сводятся к одной основе."""
+        forms = {
+            'кошк': ('кошка', 'кошки', 'кошками', 'кошкой'),
+            'красив': ('красивый', 'красивая', 'красивые', 'красивыми'),
+            'гуля': ('гулять', 'гуляли', 'гуляла'),
+        }
+        for expected, words in forms.items():
+            for word in words:
+                with self.subTest(word=word):
+                    self.assertEqual(stem(word), expected)
+
+    def test_latin_words_are_only_lowered(self):
+        """Латиница и цифры не обрезаются."""
+        self.assertEqual(stem('Django'), 'django')
+        self.assertEqual(stem('2022'), '2022')
+
+
+class SearchViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.cats = Post.objects.create(
+            text='Красивые кошки гуляли по крыше', author=self.user
+        )
+        self.dogs = Post.objects.create(
+            text='Собака лает на кошку, кошка шипит на собаку',
+            author=self.user
+        )
+
+    def found(self, query, page=None):
+        params = {'q': query}
+        if page:
+            params['page'] = page
+        response = self.client.get(reverse('posts:search'), params)
+        return list(response.context['page_obj'])
+
+    def test_search_matches_other_word_forms(self):
+        """Запрос находит посты с другими формами тех же слов."""
+        self.assertEqual(self.found('красивая кошка'), [self.cats])
+        self.assertEqual(self.found('гулять'), [self.cats])
+        self.assertEqual(self.found('жираф'), [])
+
+    def test_results_are_ranked(self):
+        """Пост, где слово встречается чаще, идёт первым."""
+        self.assertEqual(self.found('кошками'), [self.dogs, self.cats])
+
+    def test_index_follows_edits_and_deletes(self):
+        """Индекс обновляется при правке и удалении поста."""
+        self.cats.text = 'Жираф ест листья'
+        self.cats.save()
+        self.assertEqual(self.found('жирафы'), [self.cats])
+        self.assertEqual(self.found('крыша'), [])
+        self.cats.delete()
+        self.assertEqual(self.found('жирафы'), [])
+
+    def test_results_are_paginated(self):
+        """Результаты делятся на страницы, ссылки сохраняют запрос."""
+        Post.objects.bulk_create([
+            Post(text=f'Попугай номер {number}', author=self.user)
+            for number in range(QT_POST_PG + 3)
+        ])
+        # bulk_create обходит сигналы, индекс дополняет команда
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.found('попугаи')), QT_POST_PG)
+        self.assertEqual(len(self.found('попугаи', page=2)), 3)
+        response = self.client.get(reverse('posts:search'), {'q': 'попугаи'})
+        self.assertContains(response, '?q=%D0%BF')
+        self.assertContains(response, 'page=2')
+
+    def test_empty_query_shows_only_form(self):
+        """Без запроса страница показывает только форму."""
+        response = self.client.get(reverse('posts:search'))
+        self.assertIsNone(response.context['page_obj'])
+        self.assertContains(response, 'name="q"')
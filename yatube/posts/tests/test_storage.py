@@ -0,0 +1,236 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from PIL import Image
+
+from ..models import Post, User
+from ..storage import (
+    image_references, post_images, purge_image, purge_trash, release_image,
+    restore_image, trash_name
+)
+from ..thumbnails import get_ready_thumbnail
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(color='orange', name='photo.jpg'):
+    buffer = BytesIO()
+    Image.new('RGB', (60, 40), color).save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, BACKGROUND_WORKERS=0)
+class ContentAddressedStorageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def create(self, image):
+        return Post.objects.create(text='Текст', author=self.user, image=image)
+
+    def test_same_content_stored_once(self):
+        """Одинаковые картинки лежат в одном файле с именем по хэшу."""
+        first = self.create(make_image(name='first.jpg'))
+        second = self.create(make_image(name='second.JPG'))
+        self.assertEqual(first.image.name, second.image.name)
+        digest = first.image_hash
+        self.assertEqual(
+            first.image.name, f'posts/{digest[:2]}/{digest[2:4]}/{digest}.jpg'
+        )
+        self.assertEqual(image_references(first.image.name), 2)
+        self.assertNotEqual(
+            self.create(make_image('teal')).image.name, first.image.name
+        )
+
+    def test_file_kept_while_referenced(self):
+        """Файл удаляется только вместе с последней ссылкой на него."""
+        first = self.create(make_image())
+        second = self.create(make_image())
+        name = first.image.name
+        first.delete()
+        self.assertFalse(release_image(name))
+        self.assertTrue(post_images.exists(name))
+        second.delete()
+        self.assertTrue(release_image(name))
+        self.assertFalse(post_images.exists(name))
+        self.assertTrue(post_images.exists(trash_name(name)))
+        self.assertEqual(purge_trash(0), 1)
+        self.assertFalse(post_images.exists(trash_name(name)))
+
+    def test_reference_appearing_during_release_keeps_file(self):
+        """Пост, зафиксированный во время освобождения, не теряет файл."""
+        name = self.create(make_image()).image.name
+        # Первый подсчёт ещё не видит пост, повторный — видит
+        with mock.patch(
+            'posts.storage.image_references', side_effect=[0, 1]
+        ):
+            self.assertFalse(release_image(name))
+        self.assertTrue(post_images.exists(name))
+        self.assertFalse(post_images.exists(trash_name(name)))
+
+    def test_reused_file_restored_from_trash(self):
+        """Файл, ушедший в корзину раньше фиксации поста, возвращается."""
+        post = self.create(make_image())
+        name = post.image.name
+        with mock.patch('posts.storage.image_references', return_value=0):
+            self.assertTrue(release_image(name))
+        self.assertFalse(post_images.exists(name))
+        self.assertTrue(restore_image(name))
+        self.assertTrue(post_images.exists(name))
+        # Поздний таймер удаления не трогает файл, на который есть ссылка
+        purge_image(name)
+        self.assertTrue(post_images.exists(name))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, BACKGROUND_WORKERS=0)
+class ImageReleaseTest(TransactionTestCase):
+    """Файлы освобождаются после фиксации транзакции."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+
+    def test_deleted_post_releases_file(self):
+        """Удаление последнего поста удаляет его картинку."""
+        post = Post.objects.create(
+            text='Текст', author=self.user, image=make_image()
+        )
+        name = post.image.name
+        post.delete()
+        self.assertFalse(post_images.exists(name))
+
+    def test_replaced_image_releases_file(self):
+        """Замена картинки удаляет прежний файл."""
+        post = Post.objects.create(
+            text='Текст', author=self.user, image=make_image()
+        )
+        name = post.image.name
+        post.image = make_image('teal')
+        post.save()
+        self.assertFalse(post_images.exists(name))
+        self.assertTrue(post_images.exists(post.image.name))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, BACKGROUND_WORKERS=0)
+class MigrateImagesCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        # Файлы в старой раскладке: имя из загрузки, дубликаты отдельно
+        legacy = FileSystemStorage(location=TEMP_MEDIA_ROOT)
+        self.posts = []
+        for color in ('orange', 'orange', 'teal'):
+            name = legacy.save(
+                'posts/photo.jpg', ContentFile(make_image(color).read())
+            )
+            post = Post.objects.create(text='Текст', author=self.user)
+            Post.objects.filter(pk=post.pk).update(image=name)
+            self.posts.append(post)
+        self.legacy_names = list(
+            Post.objects.order_by('pk').values_list('image', flat=True)
+        )
+
+    def call(self, *args):
+        out = StringIO()
+        call_command('migrate_images', *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_dry_run_changes_nothing(self):
+        """dry-run только считает переносы."""
+        self.assertIn('Будет перенесено файлов: 3', self.call('--dry-run'))
+        self.assertEqual(
+            list(Post.objects.order_by('pk').values_list('image', flat=True)),
+            self.legacy_names
+        )
+
+    def test_legacy_files_converted(self):
+        """Картинки переезжают под имена по хэшу, дубликаты сливаются."""
+        out = self.call('--batch-size', '2')
+        self.assertIn('Перенесено файлов: 3.', out)
+        names = list(
+            Post.objects.order_by('pk').values_list('image', flat=True)
+        )
+        self.assertEqual(names[0], names[1])
+        self.assertNotEqual(names[0], names[2])
+        for name in names:
+            self.assertIsNotNone(post_images.name_digest(name))
+            self.assertTrue(post_images.exists(name))
+        for name in self.legacy_names:
+            self.assertFalse(
+                os.path.exists(os.path.join(TEMP_MEDIA_ROOT, name))
+            )
+        # Без --purge место ещё не освобождено: файлы лежат в корзине
+        self.assertIn('лежат в trash/', out)
+        self.assertNotIn('Дубликаты занимают 0', out)
+        self.assertIn('Перенесено файлов: 0.', self.call())
+
+    def test_purge_empties_trash(self):
+        """С --purge старые файлы удаляются из корзины сразу."""
+        out = self.call('--purge')
+        # Корзина общая для тестов класса, поэтому число не точное
+        self.assertIn('удалено из корзины файлов:', out)
+        for name in self.legacy_names:
+            self.assertFalse(post_images.exists(trash_name(name)))
+
+    def test_flat_content_names_moved_to_shards(self):
+        """Файл из плоского posts/ переезжает в подкаталоги с миниатюрами."""
+        self.call()
+        post = Post.objects.get(pk=self.posts[2].pk)
+        sharded = post.image.name
+        digest = post_images.name_digest(sharded)
+        flat = f'posts/{digest}.jpg'
+        os.rename(
+            os.path.join(TEMP_MEDIA_ROOT, sharded),
+            os.path.join(TEMP_MEDIA_ROOT, flat)
+        )
+        Post.objects.filter(pk=post.pk).update(image=flat)
+        self.assertIn('Перенесено файлов: 1.', self.call())
+        post = Post.objects.get(pk=post.pk)
+        self.assertEqual(post.image.name, sharded)
+        self.assertTrue(post_images.exists(sharded))
+        self.assertFalse(post_images.exists(flat))
+        self.assertIsNotNone(get_ready_thumbnail(post.image, 'post'))
+
+    def test_image_savings_walks_shards(self):
+        """image_savings находит картинки в подкаталогах posts/ab/cd/."""
+        self.call()
+        out = StringIO()
+        call_command(
+            'image_savings', '--path', os.path.join(TEMP_MEDIA_ROOT, 'posts'),
+            stdout=out, stderr=StringIO()
+        )
+        # Другие тесты класса тоже оставляют файлы, поэтому число не точное
+        self.assertNotIn('не найдено', out.getvalue())
@@ -0,0 +1,298 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from ..cache import attach_fragments
+from ..kvstore import kvstore_stats
+from ..models import Post, User
+from ..thumbnails import (
+    generate_thumbnails, get_ready_thumbnail, prefetch_thumbnails
+)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(name='photo.jpg', size=(1200, 800), image_format='JPEG',
+               color='orange'):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, image_format)
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, BACKGROUND_WORKERS=0)
+class PostThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Текст', author=self.user, image=make_image()
+        )
+
+    def test_request_shows_placeholder_until_thumbnail_is_ready(self):
+        """Пока миниатюры нет, страница отдаёт заглушку и не строит её."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'aspect-ratio')
+        self.assertNotContains(response, '<img class="card-img')
+        self.assertIsNone(get_ready_thumbnail(self.post.image, 'post'))
+
+    def test_generated_thumbnail_replaces_placeholder(self):
+        """Построенная в фоне миниатюра появляется в лентах и на посте."""
+        self.client.get(reverse('posts:index'))
+        generate_thumbnails(self.post.pk)
+        thumbnail = get_ready_thumbnail(self.post.image, 'post')
+        self.assertEqual((thumbnail.width, thumbnail.height), (960, 339))
+        addresses = [
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+        for address in addresses:
+            with self.subTest(address=address):
+                self.assertContains(
+                    self.client.get(address), thumbnail.url
+                )
+
+    def test_picture_lists_all_variants(self):
+        """Картинка поста перечисляет в srcset все ширины и WebP."""
+        generate_thumbnails(self.post.pk)
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertContains(response, '.webp')
+        for width in settings.POSTS_THUMBNAIL_WIDTHS:
+            with self.subTest(width=width):
+                self.assertContains(response, f' {width}w', count=2)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, BACKGROUND_WORKERS=0)
+class ThumbnailKVStoreTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        cache.clear()
+        self.posts = [
+            Post.objects.create(
+                text='Текст', author=self.user, image=make_image(color=color)
+            )
+            for color in ('orange', 'teal', 'navy')
+        ]
+        for post in self.posts:
+            generate_thumbnails(post.pk)
+        # Кэш пуст: сведения о миниатюрах есть только в базе
+        cache.clear()
+
+    def test_page_thumbnails_loaded_in_one_query(self):
+        """Миниатюры всех постов страницы читаются из базы одним запросом."""
+        with CaptureQueriesContext(connection) as captured:
+            attach_fragments(self.posts)
+        kvstore_queries = [
+            query for query in captured
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+        self.assertEqual(len(kvstore_queries), 1)
+        for post in self.posts:
+            self.assertIn(
+                get_ready_thumbnail(post.image, 'post').url, post.fragment
+            )
+
+    def test_hits_and_misses_counted(self):
+        """Обращения к базе — промахи, найденное в кэше — попадания."""
+        images = [post.image for post in self.posts]
+        with prefetch_thumbnails(images, 'post'):
+            pass
+        first = kvstore_stats()
+        self.assertEqual(first['hits'], 0)
+        self.assertGreaterEqual(first['misses'], len(images))
+        with self.assertNumQueries(0):
+            with prefetch_thumbnails(images, 'post'):
+                get_ready_thumbnail(images[0], 'post')
+        loaded = first['misses']
+        self.assertEqual(kvstore_stats(), {'hits': loaded, 'misses': loaded})
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, BACKGROUND_WORKERS=0)
+class ThumbnailsCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.checkpoint = os.path.join(TEMP_MEDIA_ROOT, 'checkpoint')
+        self.posts = [
+            Post.objects.create(
+                text='Текст', author=self.user, image=make_image(color=color)
+            )
+            for color in ('orange', 'teal')
+        ]
+
+    def call(self, *args):
+        out = StringIO()
+        call_command(
+            'thumbnails', *args, '--workers', '1',
+            '--checkpoint', self.checkpoint, stdout=out, stderr=StringIO()
+        )
+        return out.getvalue()
+
+    def test_warm_builds_missing_thumbnails(self):
+        """warm строит миниатюры, dry-run только перечисляет посты."""
+        self.assertIn('для 2 постов', self.call('warm', '--dry-run'))
+        self.assertIsNone(get_ready_thumbnail(self.posts[0].image, 'post'))
+        self.call('warm')
+        for post in self.posts:
+            with self.subTest(post=post.pk):
+                self.assertIsNotNone(get_ready_thumbnail(post.image, 'post'))
+        self.assertIn('для 0 постов', self.call('warm', '--dry-run'))
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_warm_resumes_after_checkpoint(self):
+        """С --resume прогрев продолжается после сохранённой отметки."""
+        with open(self.checkpoint, 'w') as checkpoint:
+            checkpoint.write(str(self.posts[0].pk))
+        self.call('warm', '--resume')
+        self.assertIsNone(get_ready_thumbnail(self.posts[0].image, 'post'))
+        self.assertIsNotNone(get_ready_thumbnail(self.posts[1].image, 'post'))
+
+    def test_failed_post_is_retried_on_resume(self):
+        """Отметка не проходит дальше поста, который не удалось обработать."""
+        failing = self.posts[0].pk
+
+        def generate(post_id):
+            return post_id != failing and generate_thumbnails(post_id)
+
+        with mock.patch(
+            'posts.management.commands.thumbnails.generate_thumbnails',
+            side_effect=generate
+        ):
+            self.call('warm')
+        with open(self.checkpoint) as checkpoint:
+            self.assertEqual(int(checkpoint.read()), 0)
+        self.call('warm', '--resume')
+        self.assertIsNotNone(get_ready_thumbnail(self.posts[0].image, 'post'))
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_sweep_removes_thumbnails_of_missing_sources(self):
+        """sweep удаляет миниатюры картинок, которых больше нет."""
+        self.call('warm')
+        post = self.posts[0]
+        thumbnail = get_ready_thumbnail(post.image, 'post')
+        post.image.storage.delete(post.image.name)
+        self.assertIn('Нет исходника', self.call('sweep', '--dry-run'))
+        self.assertTrue(thumbnail.exists())
+        self.call('sweep')
+        self.assertFalse(thumbnail.exists())
+        self.assertIsNone(get_ready_thumbnail(post.image, 'post'))
+        self.assertIsNotNone(
+            get_ready_thumbnail(self.posts[1].image, 'post')
+        )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, BACKGROUND_WORKERS=0)
+class ImageMetadataTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Текст', author=self.user, image=make_image()
+        )
+
+    def test_metadata_stored_on_save(self):
+        """При сохранении картинки записываются размеры, вес, формат и хэш."""
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual((post.image_width, post.image_height), (1200, 800))
+        self.assertEqual(post.image_format, 'JPEG')
+        self.assertEqual(post.image_size, post.image.size)
+        self.assertEqual(len(post.image_hash), 64)
+
+    def test_identical_uploads_share_hash(self):
+        """Одинаковые картинки находятся по хэшу, разные — различаются."""
+        same = Post.objects.create(
+            text='Копия', author=self.user, image=make_image()
+        )
+        other = Post.objects.create(
+            text='Другая', author=self.user, image=make_image(size=(10, 10))
+        )
+        self.assertEqual(same.image_hash, self.post.image_hash)
+        self.assertNotEqual(other.image_hash, self.post.image_hash)
+
+    def test_removed_image_clears_metadata(self):
+        """Без картинки данные о ней не остаются."""
+        self.post.image = None
+        self.post.save()
+        self.assertIsNone(self.post.image_width)
+        self.assertEqual(self.post.image_hash, '')
+
+    def test_thumbnails_use_stored_size(self):
+        """Исходник попадает в хранилище ключей с размерами из поста."""
+        Post.objects.filter(pk=self.post.pk).update(
+            image_width=600, image_height=400
+        )
+        generate_thumbnails(self.post.pk)
+        source = default.kvstore.get(ImageFile(self.post.image))
+        self.assertEqual(source.size, [600, 400])
+
+    def test_post_detail_shows_original_size(self):
+        """Страница поста показывает размеры и вес оригинала."""
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        self.assertContains(response, '1200&times;800')
+
+    def test_command_backfills_missing_metadata(self):
+        """Команда заполняет данные старых постов и находит дубликаты."""
+        Post.objects.create(
+            text='Копия', author=self.user, image=make_image()
+        )
+        Post.objects.update(
+            image_width=None, image_height=None, image_size=None,
+            image_format='', image_hash=''
+        )
+        out = StringIO()
+        call_command('image_metadata', '--batch-size', '1', stdout=out)
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual((post.image_width, post.image_height), (1200, 800))
+        self.assertEqual(post.image_format, 'JPEG')
+        self.assertIn('Обновлено постов: 2', out.getvalue())
+        self.assertIn('Одинаковые картинки у 2 постов', out.getvalue())
@@ -1,8 +1,11 @@
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django import forms
+from django.core.cache import cache
+from django.utils import timezone
 
 from ..models import Post, Group, User, Comment
+from ..views import COMMENTS_PER_PAGE
 
 
 class PostsViewTest(TestCase):
@@ -36,6 +39,7 @@ class PostsViewTest(TestCase):
         ]
 
     def setUp(self):
+        cache.clear()
         # Создаем неавторизованный клиент
         self.guest_client = Client()
         # Создаем авторизованый клиент
@@ -218,6 +222,7 @@ class PaginatorViewsTest(TestCase):
         ]
 
     def setUp(self):
+        cache.clear()
         # Создаем авторизованый клиент
         self.user1 = User.objects.create_user(username='test_name_1')
         self.authorized_client = Client()
@@ -290,3 +295,206 @@ class PaginatorViewsTest(TestCase):
         self.assertEqual(len(
             response.context['page_obj'].object_list), POSTS_ON_SECOND_PAGE
         )
+
+
+POSTS_FOR_QUERY_COUNT = 12
+
+
+class PostsQueryCountTest(TestCase):
+    """Число запросов к БД на странице ленты не зависит от числа постов."""
+    feed_queries = {
+        '/': 2,
+        '/group/the_group/': 3,
+        '/profile/test_name_2/': 3,
+    }
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_name_2')
+        cls.group = Group.objects.create(
+            title="Заголовок",
+            slug="the_group",
+            description="Описание"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def create_posts(self, count):
+        Post.objects.bulk_create(
+            Post(text=f'Текст {i}', author=self.user, group=self.group)
+            for i in range(count)
+        )
+
+    def assert_feed_queries(self):
+        for address, queries in self.feed_queries.items():
+            with self.subTest(address=address):
+                cache.clear()
+                with self.assertNumQueries(queries):
+                    self.client.get(address)
+
+    def test_feed_queries_with_one_post(self):
+        """Лента с одним постом укладывается в фиксированное число запросов."""
+        self.create_posts(1)
+        self.assert_feed_queries()
+
+    def test_feed_queries_with_full_page(self):
+        """Полная страница ленты не порождает запросы на каждый пост."""
+        self.create_posts(POSTS_FOR_QUERY_COUNT)
+        self.assert_feed_queries()
+
+
+class PageWindowTest(TestCase):
+    """Навигация по страницам не растёт вместе с числом постов."""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_name_2')
+
+    def setUp(self):
+        cache.clear()
+
+    def add_posts(self, count):
+        Post.objects.bulk_create(
+            Post(text='Текст', author=self.user) for _ in range(count)
+        )
+
+    def page_size(self):
+        cache.clear()
+        response = self.client.get(reverse('posts:index'), {'page': 5})
+        return len(response.content), response.content.count(b'page-item')
+
+    def test_response_size_does_not_depend_on_post_count(self):
+        """Страница ленты весит одинаково при 100 и 2000 постах."""
+        self.add_posts(100)
+        small_size, small_links = self.page_size()
+        self.add_posts(1900)
+        large_size, large_links = self.page_size()
+        self.assertEqual(small_links, large_links)
+        # Разница только в длине id постов и номера последней страницы
+        self.assertLess(large_size - small_size, 100)
+
+    def test_window_around_current_page(self):
+        """Показаны края и соседи текущей страницы, разрывы — многоточие."""
+        self.add_posts(1000)
+        response = self.client.get(reverse('posts:index'), {'page': 50})
+        content = response.content.decode()
+        for number in (1, 48, 49, 50, 51, 52, 100):
+            with self.subTest(number=number):
+                self.assertIn(f'>{number}<', content)
+        self.assertNotIn('>47<', content)
+        self.assertEqual(content.count('&hellip;'), 2)
+
+
+@override_settings(POSTS_PAGINATION='cursor')
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_name_2')
+        cls.group = Group.objects.create(
+            title="Заголовок",
+            slug="the_group",
+            description="Описание"
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Текст {i}', author=cls.user, group=cls.group)
+            for i in range(POSTS_ON_FIRST_PAGE + POSTS_ON_SECOND_PAGE)
+        )
+        # Одинаковая дата: порядок внутри неё держится на id
+        Post.objects.update(pub_date=timezone.now())
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('posts:group_list', kwargs={'slug': 'the_group'})
+
+    def test_cursor_pages_walk_whole_feed(self):
+        """Курсоры ведут по ленте без пропусков и повторов."""
+        first_page = self.client.get(self.url).context['page_obj']
+        self.assertEqual(len(first_page), POSTS_ON_FIRST_PAGE)
+        self.assertFalse(first_page.has_previous())
+        self.assertTrue(first_page.has_next())
+        second_page = self.client.get(
+            self.url, {'cursor': first_page.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(len(second_page), POSTS_ON_SECOND_PAGE)
+        self.assertFalse(second_page.has_next())
+        walked = list(first_page) + list(second_page)
+        self.assertEqual(
+            walked, list(Post.objects.order_by('-pub_date', '-id'))
+        )
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Курсор назад возвращает предыдущую страницу целиком."""
+        first_page = self.client.get(self.url).context['page_obj']
+        second_page = self.client.get(
+            self.url, {'cursor': first_page.next_cursor}
+        ).context['page_obj']
+        back_page = self.client.get(
+            self.url, {'cursor': second_page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back_page), list(first_page))
+        self.assertFalse(back_page.has_previous())
+
+    def test_broken_cursor_shows_first_page(self):
+        """Испорченный курсор открывает первую страницу."""
+        response = self.client.get(self.url, {'cursor': 'не-курсор'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), POSTS_ON_FIRST_PAGE)
+        self.assertFalse(page_obj.has_previous())
+
+
+class CommentsPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(text='Текст', author=cls.user)
+        # Одинаковое время: порядок внутри него держится на id
+        created = timezone.now()
+        Comment.objects.bulk_create(
+            Comment(
+                text=f'Комментарий {i}', author=User.objects.create_user(
+                    username=f'reader_{i}'
+                ),
+                post=cls.post, created=created
+            )
+            for i in range(COMMENTS_PER_PAGE + 5)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('posts:post_detail', args=[self.post.pk])
+
+    def test_post_shows_first_page_of_comments(self):
+        """Пост показывает первую страницу комментариев и курсор дальше."""
+        response = self.client.get(self.url)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_PER_PAGE)
+        self.assertEqual(comments[0].text, 'Комментарий 0')
+        self.assertContains(response, 'data-comments-more')
+
+    def test_comment_authors_are_joined(self):
+        """Авторы комментариев не стоят отдельного запроса на каждого."""
+        # Автор поста для ETag, пост с автором и группой,
+        # страница комментариев с авторами
+        with self.assertNumQueries(3):
+            self.client.get(self.url)
+
+    def test_next_page_as_fragment_and_json(self):
+        """Следующая страница отдаётся фрагментом и в JSON."""
+        cursor = self.client.get(self.url).context['comments'].next_cursor
+        fragments_url = reverse('posts:post_comments', args=[self.post.pk])
+        response = self.client.get(fragments_url, {'cursor': cursor})
+        self.assertNotContains(response, '<html')
+        self.assertContains(response, f'Комментарий {COMMENTS_PER_PAGE}')
+        self.assertNotContains(response, 'data-comments-more')
+        data = self.client.get(
+            fragments_url, {'cursor': cursor, 'format': 'json'}
+        ).json()
+        self.assertEqual(len(data['comments']), 5)
+        self.assertEqual(data['comments'][0]['author'],
+                         f'reader_{COMMENTS_PER_PAGE}')
+        self.assertIsNone(data['next_cursor'])
@@ -0,0 +1,172 @@
+import logging
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.cache import cache
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from core.background import submit_on_commit
+
+from .cache import bump_after_commit, post_scopes
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'posts:thumbnails:pending:{}'
+PENDING_TIMEOUT = 60 * 5
+
+
+class PostThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl, который умеет только спросить готовую миниатюру."""
+
+    def get_thumbnail_file(self, file_, geometry_string, **options):
+        """ImageFile будущей миниатюры без обращения к Pillow и хранилищу.
+
+        Опции дополняются так же, как в ThumbnailBackend.get_thumbnail,
+        иначе имя файла миниатюры не совпадёт.
+        """
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def get_ready_thumbnail(self, file_, geometry_string, **options):
+        """Миниатюра из хранилища ключей или None."""
+        return default.kvstore.get(
+            self.get_thumbnail_file(file_, geometry_string, **options)
+        )
+
+
+backend = PostThumbnailBackend()
+
+
+def get_size(name):
+    """Геометрия и опции размера из settings.POSTS_THUMBNAILS."""
+    geometry, options = settings.POSTS_THUMBNAILS[name]
+    return geometry, dict(options)
+
+
+def get_variants(size):
+    """Варианты размера по ширинам и форматам: [(ширина, геометрия, опции)].
+
+    Высота каждого варианта сохраняет пропорции основной геометрии.
+    """
+    geometry, options = get_size(size)
+    width, height = (int(side) for side in geometry.split('x'))
+    variants = []
+    for image_format in settings.POSTS_THUMBNAIL_FORMATS:
+        for variant_width in settings.POSTS_THUMBNAIL_WIDTHS:
+            variant_height = round(variant_width * height / width)
+            variants.append((
+                variant_width,
+                f'{variant_width}x{variant_height}',
+                dict(options, format=image_format),
+            ))
+    return variants
+
+
+def get_ready_thumbnail(image, size):
+    if not image:
+        return None
+    geometry, options = get_size(size)
+    return backend.get_ready_thumbnail(image, geometry, **options)
+
+
+def prefetch_thumbnails(images, size):
+    """Блок, в котором миниатюры картинок уже загружены из хранилища.
+
+    Если хранилище ключей не умеет загружать пачкой, блок ничего
+    не делает и каждая миниатюра спрашивается отдельно.
+    """
+    if not hasattr(default.kvstore, 'prefetched'):
+        return nullcontext()
+    geometries = [get_size(size)] + [
+        (geometry, options) for _, geometry, options in get_variants(size)
+    ]
+    files = [
+        backend.get_thumbnail_file(image, geometry, **options)
+        for image in images if image
+        for geometry, options in geometries
+    ]
+    return default.kvstore.prefetched(files)
+
+
+def get_ready_variants(image, size):
+    """Готовые варианты размера: {формат: [(ширина, миниатюра)]}."""
+    ready = {}
+    if not image:
+        return ready
+    for width, geometry, options in get_variants(size):
+        thumbnail = backend.get_ready_thumbnail(image, geometry, **options)
+        if thumbnail is not None:
+            ready.setdefault(options['format'], []).append((width, thumbnail))
+    return ready
+
+
+def register_source(image):
+    """Записывает исходник в хранилище ключей с размерами из поста.
+
+    sorl записывает исходник рядом с каждой миниатюрой и, если размеры
+    ему неизвестны, декодирует весь файл. Когда миниатюра уже лежит
+    в хранилище, это единственная причина открыть исходник.
+    """
+    post = image.instance
+    if not post.image_width or not post.image_height:
+        return
+    source = ImageFile(image)
+    if default.kvstore.get(source) is None:
+        source.set_size((post.image_width, post.image_height))
+        default.kvstore.set(source)
+
+
+def build_thumbnails(image):
+    """Строит все размеры и варианты миниатюр картинки поста."""
+    register_source(image)
+    for size in settings.POSTS_THUMBNAILS:
+        geometry, options = get_size(size)
+        backend.get_thumbnail(image, geometry, **options)
+        for width, geometry, options in get_variants(size):
+            backend.get_thumbnail(image, geometry, **options)
+
+
+def generate_thumbnails(post_id):
+    """Строит все размеры миниатюр поста и сбрасывает его кэш.
+
+    Возвращает False, если у поста нет картинки или её файла.
+    """
+    from .models import Post
+
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=post_id
+    ).first()
+    try:
+        if post is None or not post.image:
+            return False
+        if not post.image.storage.exists(post.image.name):
+            logger.warning('Нет файла картинки поста %s', post_id)
+            return False
+        build_thumbnails(post.image)
+        bump_after_commit(*post_scopes(
+            post.pk,
+            post.author.username,
+            post.group.slug if post.group_id else None
+        ))
+        return True
+    finally:
+        cache.delete(PENDING_KEY.format(post_id))
+
+
+def schedule_thumbnails(post_id):
+    """Ставит построение миниатюр в фоновый пул, если оно ещё не стоит."""
+    if cache.add(PENDING_KEY.format(post_id), True, PENDING_TIMEOUT):
+        submit_on_commit(generate_thumbnails, post_id)
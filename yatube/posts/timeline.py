@@ -0,0 +1,185 @@
+"""Лента подписок: раскладка постов по лентам читателей при записи.
+
+Новый пост копируется в TimelineEntry каждого подписчика фоновой
+задачей, пачками по POSTS_FANOUT_BATCH. Авторов, у которых подписчиков
+не меньше POSTS_FANOUT_MAX_FOLLOWERS, не раскладывают: каждая их
+публикация стоила бы десятков тысяч вставок, поэтому их посты
+подмешиваются к ленте при чтении. Лента каждого читателя обрезается
+до POSTS_TIMELINE_LENGTH свежих постов: старше follow_feed не читает.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+
+from core.background import submit_on_commit
+
+from .models import Follow, Post, TimelineEntry, UserStats
+
+
+def is_pulled(author_id):
+    """Посты автора читаются из его профиля, а не раскладываются."""
+    return UserStats.objects.filter(
+        user_id=author_id,
+        followers_count__gte=settings.POSTS_FANOUT_MAX_FOLLOWERS
+    ).exists()
+
+
+def _entries(posts, user_ids):
+    return [
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post['pk'],
+            author_id=post['author_id'],
+            pub_date=post['pub_date'],
+        )
+        for user_id in user_ids
+        for post in posts
+    ]
+
+
+def _insert(entries):
+    # Размер одного INSERT Django подбирает под ограничения базы
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def trim_timelines(user_ids):
+    """Оставляет в лентах читателей только POSTS_TIMELINE_LENGTH постов.
+
+    Сначала одним запросом находятся переполненные ленты, потом у
+    каждой удаляется всё, что старше последнего читаемого поста.
+    """
+    length = settings.POSTS_TIMELINE_LENGTH
+    crowded = (
+        TimelineEntry.objects.filter(user_id__in=user_ids)
+        .values('user_id')
+        .annotate(entries=Count('pk'))
+        .filter(entries__gt=length)
+        .values_list('user_id', flat=True)
+    )
+    for user_id in crowded:
+        timeline = TimelineEntry.objects.filter(user_id=user_id)
+        # Самый свежий из постов, которые уже не попадают в ленту
+        cutoff = timeline.order_by('-pub_date', '-post_id').values(
+            'pub_date', 'post_id'
+        )[length]
+        timeline.filter(
+            Q(pub_date__lt=cutoff['pub_date'])
+            | Q(pub_date=cutoff['pub_date'], post_id__lte=cutoff['post_id'])
+        ).delete()
+
+
+def _follower_batches(author_id):
+    """id подписчиков автора пачками, по ключу, а не по OFFSET."""
+    last_id = 0
+    while True:
+        batch = list(
+            Follow.objects.filter(author_id=author_id, pk__gt=last_id)
+            .order_by('pk').values_list('pk', 'user_id')
+            [:settings.POSTS_FANOUT_BATCH]
+        )
+        if not batch:
+            return
+        last_id = batch[-1][0]
+        yield [user_id for _, user_id in batch]
+
+
+def fan_out_post(post_id):
+    """Раскладывает пост по лентам подписчиков автора.
+
+    Возвращает число обработанных подписчиков.
+    """
+    post = Post.objects.filter(pk=post_id).values(
+        'pk', 'author_id', 'pub_date'
+    ).first()
+    if post is None or is_pulled(post['author_id']):
+        return 0
+    total = 0
+    for user_ids in _follower_batches(post['author_id']):
+        # Каждая пачка — своя короткая транзакция
+        with transaction.atomic():
+            _insert(_entries([post], user_ids))
+            trim_timelines(user_ids)
+        total += len(user_ids)
+    return total
+
+
+def recent_posts(author_id):
+    return list(
+        Post.objects.filter(author_id=author_id)
+        .order_by('-pub_date', '-id')
+        .values('pk', 'author_id', 'pub_date')
+        [:settings.POSTS_TIMELINE_LENGTH]
+    )
+
+
+def backfill(author_id, user_ids=None):
+    """Добавляет недавние посты автора в ленты подписчиков.
+
+    Нужна после подписки и когда автор перестал быть «тянущимся»:
+    его посты за это время никто не раскладывал.
+    """
+    if is_pulled(author_id):
+        return
+    posts = recent_posts(author_id)
+    if not posts:
+        return
+    if user_ids is not None:
+        with transaction.atomic():
+            _insert(_entries(posts, user_ids))
+            trim_timelines(user_ids)
+        return
+    for batch in _follower_batches(author_id):
+        with transaction.atomic():
+            _insert(_entries(posts, batch))
+            trim_timelines(batch)
+
+
+def remove_author(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild_timeline(user_id):
+    """Собирает ленту пользователя заново по его подпискам."""
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    followed = Follow.objects.filter(user_id=user_id).exclude(
+        author__stats__followers_count__gte=(
+            settings.POSTS_FANOUT_MAX_FOLLOWERS
+        )
+    ).values('author_id')
+    posts = list(
+        Post.objects.filter(author_id__in=followed)
+        .order_by('-pub_date', '-id')
+        .values('pk', 'author_id', 'pub_date')
+        [:settings.POSTS_TIMELINE_LENGTH]
+    )
+    _insert(_entries(posts, [user_id]))
+
+
+def follow_feed(user):
+    """Посты ленты подписок: разложенные плюс посты «тянущихся» авторов.
+
+    Обе части ограничены POSTS_TIMELINE_LENGTH свежими постами, так что
+    объединение и сортировка не зависят от числа подписок.
+    """
+    length = settings.POSTS_TIMELINE_LENGTH
+    timeline = TimelineEntry.objects.filter(user=user).order_by(
+        '-pub_date', '-post_id'
+    ).values('post_id')[:length]
+    pulled_authors = Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gte=(
+            settings.POSTS_FANOUT_MAX_FOLLOWERS
+        )
+    ).values('author_id')
+    pulled = Post.objects.filter(author_id__in=pulled_authors).order_by(
+        '-pub_date', '-id'
+    ).values('pk')[:length]
+    return Post.objects.filter(Q(pk__in=timeline) | Q(pk__in=pulled))
+
+
+def schedule_fan_out(post_id):
+    submit_on_commit(fan_out_post, post_id)
+
+
+def schedule_backfill(author_id, user_ids=None):
+    submit_on_commit(backfill, author_id, user_ids)
@@ -0,0 +1,175 @@
+import hashlib
+import os
+from functools import wraps
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from PIL import Image, ImageOps
+
+# Формат исходника -> формат, в котором храним картинку
+STORED_FORMATS = {
+    'JPEG': 'JPEG',
+    'MPO': 'JPEG',
+    'PNG': 'PNG',
+    'WEBP': 'WEBP',
+}
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+MIN_QUALITY = 50
+QUALITY_STEP = 10
+SHRINK_FACTOR = 0.75
+EXIF_ORIENTATION = 0x0112
+# При этих значениях ориентации картинка показывается повёрнутой на 90°
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+EMPTY_METADATA = {
+    'image_width': None,
+    'image_height': None,
+    'image_size': None,
+    'image_format': '',
+    'image_hash': '',
+}
+
+
+def upload_too_large_message():
+    limit = filesizeformat(settings.POSTS_IMAGE_UPLOAD_MAX_SIZE)
+    return f'Файл слишком большой, загрузите не больше {limit}.'
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    """Отбрасывает слишком большие файлы прямо во время приёма.
+
+    Файл пропускается, как только его размер (или размер всего тела
+    запроса) превышает POSTS_IMAGE_UPLOAD_MAX_SIZE, так что он не
+    буферизуется целиком ни в памяти, ни на диске. Имена отброшенных
+    полей попадают в request.upload_errors.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        self.request_length = content_length
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.received = 0
+        if self.request_length > settings.POSTS_IMAGE_UPLOAD_MAX_SIZE:
+            self.reject()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.POSTS_IMAGE_UPLOAD_MAX_SIZE:
+            self.reject()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+    def reject(self):
+        if not hasattr(self.request, 'upload_errors'):
+            self.request.upload_errors = {}
+        self.request.upload_errors[self.field_name] = (
+            upload_too_large_message()
+        )
+        raise SkipFile()
+
+
+def limit_uploads(view):
+    """Включает LimitedUploadHandler только для этого представления.
+
+    Обработчик нужно добавить до первого чтения request.POST, а его
+    читает CsrfViewMiddleware, поэтому проверка CSRF переносится внутрь
+    декоратора, как советует документация Django.
+    """
+    protected = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers.insert(0, LimitedUploadHandler(request))
+        return protected(request, *args, **kwargs)
+
+    return wrapper
+
+
+def _encode(image, image_format, quality):
+    buffer = BytesIO()
+    options = {'optimize': True}
+    if image_format in ('JPEG', 'WEBP'):
+        options['quality'] = quality
+    image.save(buffer, image_format, **options)
+    return buffer
+
+
+def normalize_image(uploaded):
+    """Поворачивает по EXIF, уменьшает и пережимает загруженную картинку.
+
+    EXIF и прочие метаданные не переносятся. Размеры ограничены
+    POSTS_IMAGE_MAX_DIMENSIONS, а вес — POSTS_IMAGE_MAX_BYTES: сначала
+    снижается качество, потом размер. Анимированные картинки
+    возвращаются как есть.
+    """
+    uploaded.seek(0)
+    with Image.open(uploaded) as source:
+        if getattr(source, 'is_animated', False):
+            uploaded.seek(0)
+            return uploaded
+        image_format = STORED_FORMATS.get(source.format)
+        image = ImageOps.exif_transpose(source)
+        if image_format is None:
+            # GIF, BMP и прочее храним в PNG, чтобы не потерять прозрачность
+            image_format = 'PNG'
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.thumbnail(settings.POSTS_IMAGE_MAX_DIMENSIONS)
+        quality = settings.POSTS_IMAGE_QUALITY
+        buffer = _encode(image, image_format, quality)
+        while buffer.tell() > settings.POSTS_IMAGE_MAX_BYTES:
+            if image_format != 'PNG' and quality > MIN_QUALITY:
+                quality -= QUALITY_STEP
+            else:
+                width, height = image.size
+                image = image.resize((
+                    max(1, int(width * SHRINK_FACTOR)),
+                    max(1, int(height * SHRINK_FACTOR)),
+                ))
+            buffer = _encode(image, image_format, quality)
+    name = f'{os.path.splitext(uploaded.name)[0]}.{EXTENSIONS[image_format]}'
+    size = buffer.tell()
+    buffer.seek(0)
+    return InMemoryUploadedFile(
+        buffer, uploaded.field_name, name,
+        Image.MIME.get(image_format), size, None
+    )
+
+
+def file_hash(file):
+    """SHA-256 содержимого файла; файл читается по частям."""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def image_metadata(file):
+    """Размеры, вес, формат и SHA-256 картинки в виде полей Post.
+
+    Размеры те, с которыми картинку покажут, — с учётом поворота
+    из EXIF. Pillow читает только заголовок, пиксели не декодируются.
+    """
+    digest = file_hash(file)
+    with Image.open(file) as image:
+        width, height = image.size
+        if image.getexif().get(EXIF_ORIENTATION) in TRANSPOSED_ORIENTATIONS:
+            width, height = height, width
+        image_format = image.format
+    file.seek(0)
+    return {
+        'image_width': width,
+        'image_height': height,
+        'image_size': file.size,
+        'image_format': image_format,
+        'image_hash': digest,
+    }
@@ -1,33 +1,55 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from django.shortcuts import redirect, render, get_object_or_404
 from django.core.paginator import Paginator
-from django.views.decorators.cache import cache_page
+from django.utils.http import urlencode
+from django.views.decorators.http import require_POST
 
-from .models import Post, Group, User
+from .models import Follow, Post, Group, User
+from .cache import (
+    attach_fragments, cache_control_by_user, cache_feed, conditional
+)
 from .forms import PostForm, CommentForm
+from .pagination import CursorPaginator
+from .search import search_posts
+from .thumbnails import prefetch_thumbnails
+from .timeline import follow_feed
+from .uploads import limit_uploads
 
 QT_POST_PG = 10
+COMMENTS_PER_PAGE = 20
 
 
 def paginator(request, queryset):
-    paginator = Paginator(queryset, QT_POST_PG)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    if settings.POSTS_PAGINATION == 'cursor':
+        cursor_paginator = CursorPaginator(queryset, QT_POST_PG)
+        page_obj = cursor_paginator.get_page(request.GET.get('cursor'))
+    else:
+        paginator = Paginator(queryset, QT_POST_PG)
+        page_number = request.GET.get('page')
+        page_obj = paginator.get_page(page_number)
+    attach_fragments(page_obj)
     return page_obj
 
 
-@cache_page(60 * 20)
+@cache_control_by_user
+@conditional('index', per_user=True)
+@cache_feed('index')
 def index(request):
-    post_list = Post.objects.all()
+    post_list = Post.objects.select_related('author', 'group')
     context = {
         'page_obj': paginator(request, post_list),
     }
     return render(request, 'posts/index.html', context)
 
 
+@cache_control_by_user
+@conditional('group:{slug}', per_user=True)
+@cache_feed('group:{slug}')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = group.posts.select_related('author')
     context = {
         'group': group,
         'page_obj': paginator(request, posts),
@@ -35,31 +57,115 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@cache_control_by_user
+@conditional('profile:{username}', per_user=True)
+@cache_feed('profile:{username}', per_user=True)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post = author.posts.all()
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username
+    )
+    post = author.posts.select_related('group')
+    following = (
+        request.user.is_authenticated
+        and request.user != author
+        and Follow.objects.filter(user=request.user, author=author).exists()
+    )
     context = {
         'author': author,
         'page_obj': paginator(request, post),
+        'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+def comments_page(post, cursor):
+    comment_paginator = CursorPaginator(
+        post.comments.select_related('author'),
+        COMMENTS_PER_PAGE,
+        ordering=('created', 'id')
+    )
+    return comment_paginator.get_page(cursor)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        page_obj = Paginator(search_posts(query), QT_POST_PG).get_page(
+            request.GET.get('page')
+        )
+        attach_fragments(page_obj)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        # Ссылки пагинатора должны сохранять сам запрос
+        'page_params': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def post_detail_scopes(request, post_id):
+    """Пост и профиль автора: на странице есть число его постов."""
+    username = Post.objects.filter(pk=post_id).order_by().values_list(
+        'author__username', flat=True
+    ).first()
+    scopes = [f'post:{post_id}']
+    if username is not None:
+        scopes.append(f'profile:{username}')
+    return scopes
+
+
+@cache_control_by_user
+@conditional(post_detail_scopes, per_user=True)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'),
+        pk=post_id
+    )
     form = CommentForm()
-    comments = post.comments.all()
+    comments = comments_page(post, request.GET.get('comments'))
     context = {
         'post': post,
         'form': form,
         'comments': comments,
     }
-    return render(request, 'posts/post_detail.html', context)
+    with prefetch_thumbnails([post.image], 'post'):
+        return render(request, 'posts/post_detail.html', context)
+
+
+def post_comments(request, post_id):
+    """Следующая страница комментариев: HTML-фрагмент или JSON."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = comments_page(post, request.GET.get('cursor'))
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created.isoformat(),
+                }
+                for comment in comments
+            ],
+            'next_cursor': comments.next_cursor,
+        })
+    context = {
+        'post': post,
+        'comments': comments,
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
 
 
 @login_required
+@limit_uploads
 def post_create(request):
-    form = PostForm(request.POST or None, files=request.FILES or None)
+    form = PostForm(
+        request.POST or None,
+        files=request.FILES or None,
+        upload_errors=getattr(request, 'upload_errors', None)
+    )
     username = request.user.username
     if not form.is_valid():
         return render(request, 'posts/create_post.html', {'form': form})
@@ -70,6 +176,7 @@ def post_create(request):
 
 
 @login_required
+@limit_uploads
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     if post.author != request.user:
@@ -77,7 +184,8 @@ def post_edit(request, post_id):
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
-        instance=post
+        instance=post,
+        upload_errors=getattr(request, 'upload_errors', None)
     )
     if form.is_valid():
         post = form.save(commit=False)
@@ -90,7 +198,10 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    # Автор и группа нужны сигналу, чтобы сбросить кэш лент поста
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id
+    )
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
@@ -98,3 +209,30 @@ def add_comment(request, post_id):
         comment.post = post
         comment.save()
     return redirect('posts:post_detail', post_id=post_id)
+
+
+@login_required
+def follow_index(request):
+    posts = follow_feed(request.user).select_related('author', 'group')
+    context = {
+        'page_obj': paginator(request, posts),
+    }
+    return render(request, 'posts/follow.html', context)
+
+
+@login_required
+@require_POST
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        Follow.objects.get_or_create(user=request.user, author=author)
+    return redirect('posts:profile', username=username)
+
+
+@login_required
+@require_POST
+def profile_unfollow(request, username):
+    author = get_object_or_404(User, username=username)
+    # delete() по выборке шлёт post_delete, счётчики и лента обновятся
+    Follow.objects.filter(user=request.user, author=author).delete()
+    return redirect('posts:profile', username=username)
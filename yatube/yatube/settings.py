@@ -46,11 +46,13 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.PrimaryPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -86,13 +88,65 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Профиль соединений выбирается переменной окружения YATUBE_DB_PROFILE,
+# по умолчанию dev; production включает wsgi.py.
+# production держит соединение между запросами и проверяет его перед
+# запросом; в SQLite включает WAL, чтобы чтение не ждало записи.
+# dev — поведение Django по умолчанию: соединение на каждый запрос.
+DATABASE_PROFILES = {
+    'dev': {
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': False,
+        'PRAGMAS': {},
+    },
+    'production': {
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'PRAGMAS': {
+            'journal_mode': 'WAL',
+            # В WAL NORMAL не портит базу при сбое, теряются только
+            # последние транзакции при отключении питания
+            'synchronous': 'NORMAL',
+            'mmap_size': 256 * 1024 * 1024,
+            # Отрицательное значение — размер в КБ, а не в страницах
+            'cache_size': -64 * 1024,
+            'temp_store': 'MEMORY',
+        },
+    },
+}
+
+YATUBE_DB_PROFILE = os.getenv('YATUBE_DB_PROFILE', 'dev')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Сколько секунд ждать, пока запись другого соединения
+        # освободит базу, прежде чем вернуть "database is locked"
+        'OPTIONS': {'timeout': 20},
+        **DATABASE_PROFILES[YATUBE_DB_PROFILE],
     }
 }
 
+# Реплики для чтения: пути к файлам SQLite через запятую в
+# YATUBE_DB_REPLICAS. Запись идёт в default, `manage.py replicate`
+# копирует её в реплики. После записи пользователь читает из default
+# DATABASE_REPLICA_LAG секунд — столько реплике даётся, чтобы догнать.
+DATABASE_REPLICAS = []
+DATABASE_REPLICA_LAG = 5
+
+for number, path in enumerate(
+    filter(None, os.getenv('YATUBE_DB_REPLICAS', '').split(',')), 1
+):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'NAME': path.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -148,8 +202,90 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Постраничный вывод лент: 'pages' — номера страниц,
+# 'cursor' — переход по курсору без COUNT(*) и OFFSET
+POSTS_PAGINATION = 'pages'
+
+# Страницы лент сбрасываются сигналами при записи, поэтому живут долго
+POSTS_FEED_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Разметка отдельного поста, общая для всех лент
+POSTS_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Потоки для фоновых задач; 0 — выполнять задачи сразу в запросе
+BACKGROUND_WORKERS = 4
+
+# Размеры миниатюр постов: имя -> (геометрия sorl, опции)
+POSTS_THUMBNAILS = {
+    'post': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+
+# Варианты каждого размера для srcset: ширины в пикселях и форматы
+POSTS_THUMBNAIL_WIDTHS = (480, 960, 1440)
+POSTS_THUMBNAIL_FORMATS = ('WEBP', 'JPEG')
+
+# Сведения о готовых миниатюрах: в общем кэше с запасом в базе,
+# на страницу — одним get_many
+THUMBNAIL_KVSTORE = 'posts.kvstore.KVStore'
+
+# Лента подписок: пост раскладывается по лентам подписчиков пачками
+# по POSTS_FANOUT_BATCH; у авторов с POSTS_FANOUT_MAX_FOLLOWERS подписчиков
+# и больше посты подмешиваются при чтении. В ленте видны
+# POSTS_TIMELINE_LENGTH последних постов.
+POSTS_FANOUT_BATCH = 1000
+POSTS_FANOUT_MAX_FOLLOWERS = 5000
+POSTS_TIMELINE_LENGTH = 1000
+
+# Загрузка картинок: в формах поста (posts.uploads.limit_uploads) файл
+# больше лимита отбрасывается ещё при приёме,
+# принятый поворачивается по EXIF, лишается метаданных и пережимается
+# до указанных размеров и веса
+POSTS_IMAGE_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+POSTS_IMAGE_MAX_DIMENSIONS = (1920, 1920)
+POSTS_IMAGE_MAX_BYTES = 1024 * 1024
+POSTS_IMAGE_QUALITY = 85
+# Сколько секунд картинка без ссылок лежит в корзине до удаления
+POSTS_IMAGE_TRASH_GRACE = 60 * 60
+
+# Кэш выбирается переменной окружения YATUBE_CACHE. locmem живёт внутри
+# процесса, поэтому при нескольких воркерах gunicorn нужен общий кэш:
+# file и db работают без внешних сервисов (для db выполните
+# `manage.py createcachetable`), memcached и redis — отдельные серверы.
+# Их клиенты не входят в requirements.txt: для memcached нужен пакет
+# python-memcached, для redis — django-redis; без них сайт не запустится
+# с этим пресетом (см. REQUIRES и core.cache).
+CACHE_PRESETS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': '',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'yatube_cache',
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': '127.0.0.1:11211',
+        'REQUIRES': ('memcache', 'python-memcached'),
+    },
+    'redis': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/1',
+        'REQUIRES': ('django_redis', 'django-redis'),
+    },
+}
+
+YATUBE_CACHE = os.getenv('YATUBE_CACHE', 'locmem')
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': CACHE_PRESETS[YATUBE_CACHE]['BACKEND'],
+        'LOCATION': os.getenv(
+            'YATUBE_CACHE_LOCATION', CACHE_PRESETS[YATUBE_CACHE]['LOCATION']
+        ),
     }
 }
@@ -12,5 +12,7 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+# Через WSGI сайт работает в бою; manage.py и тесты остаются на dev
+os.environ.setdefault('YATUBE_DB_PROFILE', 'production')
 
 application = get_wsgi_application()